@@ -1,11 +1,23 @@
 # app.py
 import os
 import csv
+import time
 from datetime import datetime
+import pandas as pd
 import streamlit as st
 
+from utils.prewarm import PREWARM_BLOCKING, PREWARM_TIMEOUT, start_prewarm
+from utils.search import request_goto
+from utils.unified_search import get_unified_index
+
 st.set_page_config(page_title="BREEAM & LEED – przegląd certyfikacji", layout="wide")
 
+# ====== Rozgrzewanie cache (raz na proces, w tle) ======
+warm = start_prewarm()
+if warm is not None and PREWARM_BLOCKING and not warm.done:
+    with st.spinner("Przygotowuję dane (pierwsze uruchomienie serwera)…"):
+        warm.wait(PREWARM_TIMEOUT)
+
 # ====== KONFIG (jak było wcześniej: credentials.py / ENV) ======
 BASE_DEFAULT = "https://api.breeam.com/datav1"
 try:
@@ -56,6 +68,55 @@ nav_buttons("home")
 st.title("BREEAM & LEED – przegląd certyfikacji")
 #st.caption("Aplikacja wielostronicowa: BREEAM (API In-Use), BREEAM wygasłe (Excel), LEED (Excel).")
 
+if warm is not None:
+    with st.expander("Rozgrzewanie cache przy starcie (czasy)", expanded=False):
+        st.caption(
+            f"{'Zakończone' if warm.done else 'W toku'} – łącznie {warm.total_seconds:.1f} s"
+        )
+        st.dataframe(
+            pd.DataFrame(
+                [{"zadanie": name, **t} for name, t in warm.timings.items()]
+            ).rename(columns={"status": "stan", "seconds": "czas [s]", "error": "błąd"}),
+            use_container_width=True,
+            hide_index=True,
+        )
+
+
+st.divider()
+
+
+# ====== Wyszukiwarka: wszystkie źródła ======
+st.subheader("Szukaj certyfikatu")
+st.caption("Nazwa, miasto, adres, assessor lub numer certyfikatu – BREEAM aktualne (lokalna kopia API), BREEAM wygasłe i LEED.")
+
+unified = get_unified_index(BREEAM_HIST_PATH, LEED_PATH)
+# tylko źródła zmienione od ostatniego przebiegu (mtime pliku / stan lokalnej kopii API)
+if not len(unified):
+    with st.spinner("Buduję indeks wyszukiwarki…"):
+        unified.refresh()
+else:
+    unified.refresh()
+
+query = st.text_input("Szukaj", key="home_q", placeholder="np. Warsaw Spire, Łódź, Emilii Plater, BREEAM-…")
+if query.strip():
+    t0 = time.perf_counter()
+    hits = unified.search(query)
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    st.caption(f"{len(hits)} trafień w {elapsed_ms:.0f} ms (indeks: {len(unified):,} rekordów)")
+    if hits.empty:
+        st.info("Brak certyfikatów pasujących do wyszukiwania.")
+    for i, hit in enumerate(hits.itertuples(index=False)):
+        c_txt, c_btn = st.columns([5, 1], gap="small")
+        details = " · ".join(x for x in (hit.address, hit.assessor, hit.certificate) if x)
+        c_txt.markdown(f"**{hit.label}**  \n{hit.source_label}" + (f" – {details}" if details else ""))
+        if c_btn.button("Otwórz", key=f"home_open_{i}", use_container_width=True):
+            # BREEAM API: strona pokazuje wybrane zakresy – ustawiamy ten, z którego jest rekord
+            extra = {"b_goto_scope": hit.scope} if hit.source == "breeam_api" else {}
+            request_goto(hit.page, hit.picker_key, hit.key, **extra)
+
+if unified.errors:
+    st.warning("Część źródeł nie jest w wyszukiwarce:\n\n" + "\n".join(f"- {k}: {e}" for k, e in unified.errors.items()))
+
 
 st.divider()
 
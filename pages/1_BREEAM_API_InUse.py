@@ -1,39 +1,38 @@
 # pages/1_BREEAM_API_InUse.py
-import os
-import re
 import json
-import requests
+import queue
+import threading
+from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import pandas as pd
-from datetime import date
-from dateutil import parser as dtparser
 import streamlit as st
-from requests.auth import HTTPBasicAuth
-
-# ================== KONFIGURACJA BREEAM (credentials.py / ENV / st.secrets) ==================
-BASE_DEFAULT = "https://api.breeam.com/datav1"
-
-def _get_secret(key: str, default: str = "") -> str:
-    # streamlit cloud -> st.secrets
-    try:
-        if key in st.secrets:
-            return str(st.secrets.get(key))
-    except Exception:
-        pass
-    # lokalnie -> ENV
-    return os.getenv(key, default)
-
-# Najpierw próbuj credentials.py (lokalnie), potem secrets/env
-try:
-    from credentials import BREEAM_USER as _CU, BREEAM_PASS as _CP
-    BREEAM_USER, BREEAM_PASS = _CU, _CP
-except Exception:
-    BREEAM_USER = _get_secret("BREEAM_USER", "")
-    BREEAM_PASS = _get_secret("BREEAM_PASS", "")
-
-BREEAM_BASE = _get_secret("BREEAM_API_BASE", BASE_DEFAULT)
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from utils import telemetry
+from utils.breeam_api import (
+    BREEAM_BASE,
+    breeam_countries,
+    breeam_get,
+    breeam_schemes_df,
+    credentials_ok,
+    fetch_assessments,
+    get_secret,
+    load_breeam_local,
+    sync_breeam,
+)
+from utils.breeam_store import get_assessment_store, scope_key
+from utils.filters import BitmapIndex, FilterMask, expiry_buckets
+from utils.prewarm import start_prewarm
+from utils.search import build_search_index, project_picker
+from utils.table import render_expiry_table
+
+# ile zapytań (państwo × scheme) naraz przy pobieraniu wielu zestawów
+BREEAM_FETCH_WORKERS = int(get_secret("BREEAM_FETCH_WORKERS", "4"))
 
 # ================== USTAWIENIA STRONY ==================
 st.set_page_config(page_title="BREEAM aktualne", layout="wide")
+# rozgrzewanie cache także przy wejściu prosto na tę stronę (raz na proces)
+start_prewarm()
 
 # ================== NAV BUTTONS ==================
 def nav_buttons(active: str = "breeam_api"):
@@ -55,81 +54,6 @@ nav_buttons("breeam_api")
 st.title("🏢 BREEAM aktualne")
 
 # ================== HELPERY ==================
-DATE_RX = re.compile(
-    r"(\d{4}[-/\.]\d{1,2}[-/\.]\d{1,2})|"
-    r"(\d{1,2}[-/\.]\d{1,2}[-/\.]\d{2,4})|"
-    r"(\d{4}[-/\.]\d{1,2})"
-)
-
-def parse_date_any(x):
-    if x is None or (isinstance(x, float) and pd.isna(x)):
-        return None
-    s = str(x).strip()
-    if not s:
-        return None
-    try:
-        return dtparser.parse(s, dayfirst=True, fuzzy=True).date()
-    except Exception:
-        pass
-    m = DATE_RX.search(s)
-    if m:
-        try:
-            return dtparser.parse(m.group(0), dayfirst=True).date()
-        except Exception:
-            return None
-    return None
-
-def months_left_signed(d):
-    if d is None or pd.isna(d):
-        return None
-    t = date.today()
-    m = (d.year - t.year) * 12 + (d.month - t.month)
-    if d >= t and d.day > t.day:
-        m += 1
-    elif d < t and d.day < t.day:
-        m -= 1
-    return int(m)
-
-def add_expiry_status(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-
-    def status(m):
-        if pd.isna(m):
-            return "❓ Brak daty"
-        m = int(m)
-        if m < 0:
-            return "⛔ Wygasły"
-        if m <= 6:
-            return "🔴 ≤ 6 mies."
-        if m <= 12:
-            return "🟠 6–12 mies."
-        if m <= 18:
-            return "🟡 12–18 mies."
-        return "✅ > 18 mies."
-
-    if "months_to_expiry" in df.columns:
-        df["expiry_status"] = df["months_to_expiry"].apply(status)
-    else:
-        df["expiry_status"] = "❓ Brak daty"
-    return df
-
-def color_rows_by_expiry(row):
-    m = row.get("months_to_expiry", None)
-    if pd.isna(m):
-        return [""] * len(row)
-    m = int(m)
-    if m < 0:
-        color = "#ffcccc"
-    elif m <= 6:
-        color = "#ffe0cc"
-    elif m <= 12:
-        color = "#fff2cc"
-    elif m <= 18:
-        color = "#fff7cc"
-    else:
-        color = "#e6ffea"
-    return [f"background-color: {color}"] * len(row)
-
 def sanitize_multiselect_state(state_key: str, options: list[str]):
     opts_set = set(options)
     if state_key in st.session_state:
@@ -166,148 +90,71 @@ def build_address(row: pd.Series) -> str:
 
     return ", ".join(parts) if parts else "–"
 
-def _listify(x):
-    if x is None:
-        return []
-    if isinstance(x, list):
-        return x
-    if isinstance(x, dict):
-        return [x]
-    return []
-
 # ================== API CALLS ==================
-if not (BREEAM_USER and BREEAM_PASS):
+if not credentials_ok():
     st.error("Brak poświadczeń. Dodaj credentials.py lub ustaw BREEAM_USER/BREEAM_PASS (na Streamlit Cloud najlepiej w Secrets).")
     st.stop()
 
-auth = HTTPBasicAuth(BREEAM_USER, BREEAM_PASS)
-HDRS = {"Accept": "application/json"}
-
-@st.cache_data(show_spinner=False, ttl=60 * 30)
-def breeam_get(path: str, params=None):
-    p = path.lstrip("/")
-    url = f"{BREEAM_BASE.rstrip('/')}/{p}"
-    r = requests.get(url, auth=auth, headers=HDRS, params=params, timeout=60)
-    if r.status_code == 401:
-        raise RuntimeError("401 Unauthorized – sprawdź login/hasło/uprawnienia.")
-    r.raise_for_status()
-    try:
-        return r.json()
-    except Exception:
-        return {"_raw_text": r.text}
-
-@st.cache_data(show_spinner=False, ttl=60 * 30)
-def breeam_countries():
-    data = breeam_get("/countries")
-    countries = data.get("results", {}).get("countries", {}).get("country", None)
-    if countries is None:
-        countries = data.get("countries") or data.get("country") or []
-    return list(sorted([c for c in _listify(countries) if isinstance(c, str)]))
-
-@st.cache_data(show_spinner=False, ttl=60 * 30)
-def breeam_schemes_df():
-    data = breeam_get("/schemes")
-    base = data.get("results", {}).get("schemes", {}).get("scheme", None)
-    if base is None:
-        base = data.get("results", {}).get("scheme", None)
-    if base is None:
-        base = data.get("schemes", None)
-    if base is None:
-        base = data.get("scheme", None)
-
-    schemes = _listify(base)
-    items = []
-    for s in schemes:
-        if not isinstance(s, dict):
-            continue
-        sid = s.get("schemeID") or s.get("id") or s.get("schemeId")
-        sname = s.get("schemeName") or s.get("name") or s.get("scheme")
-        if sid is not None and sname is not None:
-            items.append({"schemeID": sid, "schemeName": str(sname)})
-
-        subs = s.get("subSchemes", {}).get("scheme", None)
-        for ss in _listify(subs):
-            if not isinstance(ss, dict):
-                continue
-            ssid = ss.get("schemeID") or ss.get("id") or ss.get("schemeId")
-            ssname = ss.get("schemeName") or ss.get("name") or ss.get("scheme")
-            if ssid is not None and ssname is not None:
-                items.append({"schemeID": ssid, "schemeName": f"{sname} / {ssname}".strip(" /")})
-
-    df = pd.DataFrame(items)
-    if not df.empty:
-        df["schemeName"] = df["schemeName"].astype(str)
-        df = df.drop_duplicates()
-
-    return df, data
-
-def normalize_breeam_from_api(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    rename_api = {
-        "buildingName": "asset_name",
-        "name": "asset_name",
-        "certNo": "certificate_number",
-        "country": "country",
-        "city": "city",
-        "county": "region",
-        "regAddresLine1": "regAddresLine1",
-        "regAddressLine1": "regAddresLine1",
-        "addressLine1": "addressLine1",
-        "projectType": "projectType",
-        "scheme": "scheme",
-        "standard": "standard",
-        "stage": "stage",
-        "assessor": "assessor",
-        "assessorAuditor": "assessor",
-        "assessorName": "assessor",
-        "auditor": "assessor",
-        "publicUrl": "publicUrl",
-        "latitude": "latitude",
-        "longitude": "longitude",
-        "lat": "latitude",
-        "lon": "longitude",
-        "lng": "longitude",
-    }
-    for src, dst in rename_api.items():
-        if src in df.columns and dst not in df.columns:
-            df[dst] = df[src]
-    return df
-
-def compute_breeam_expiries(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    if "stage" in df.columns:
-        parsed = df["stage"].map(parse_date_any)
-        df["expiry_date"] = pd.to_datetime(parsed, errors="coerce").dt.date
-        df["months_to_expiry"] = df["expiry_date"].map(months_left_signed)
-    else:
-        df["expiry_date"] = None
-        df["months_to_expiry"] = None
-    df = add_expiry_status(df)
-    return df
-
-def breeam_fetch_api(country: str | None, scheme_id: int | None) -> pd.DataFrame:
-    # kluczowa zmiana: jeśli scheme_id jest None -> pobieramy /assessments (bez scheme)
-    path = f"/assessments/{scheme_id}" if scheme_id else "/assessments"
-    params = {}
-    if country:
-        params["country"] = country
-    data = breeam_get(path, params)
-
-    raw = data.get("results", {}).get("assessments", {}).get("assessment", None)
-    if raw is None:
-        raw = data.get("assessments") or data.get("assessment") or []
-    raw = _listify(raw)
-    return pd.DataFrame(raw)
+def breeam_fetch_many(countries: list[str | None], schemes: list[tuple[int | None, str]], on_progress=None):
+    """
+    Pobiera wszystkie pary (państwo, scheme) równolegle (pula BREEAM_FETCH_WORKERS wątków).
+    Zwraca (lista [((country, scheme_id, scheme_name), DataFrame)] w kolejności zadań, lista błędów).
+    Błąd jednej pary nie przerywa pobierania pozostałych.
+    on_progress(chunks) – wołane w wątku strony z dotąd odebranymi kawałkami (podgląd tabeli).
+    Bez cache na poziomie procesu: wynik trafia do lokalnej kopii (AssessmentStore), z której czyta strona,
+    a równoległe pobrania tego samego zestawu łączy SingleFlight w fetch_assessments.
+    """
+    tasks = [(c, sid, sname) for c in countries for sid, sname in schemes]
+    frames: dict[int, pd.DataFrame] = {}
+    errors = []
+    chunks: queue.Queue = queue.Queue()
+    received = []
+
+    ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(BREEAM_FETCH_WORKERS, len(tasks))),
+        initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx),
+    ) as ex:
+        futures = {ex.submit(fetch_assessments, c, sid, on_chunk=chunks.put): i for i, (c, sid, _) in enumerate(tasks)}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+            fresh = False
+            while not chunks.empty():
+                received.append(chunks.get_nowait())
+                fresh = True
+            if fresh and on_progress is not None:
+                on_progress(received)
+            for fut in done:
+                i = futures[fut]
+                c, _, sname = tasks[i]
+                try:
+                    part = fut.result()
+                except Exception as e:
+                    errors.append(f"{c or '(dowolne)'} / {sname}: {e}")
+                    continue
+                frames[i] = part
+
+    return [(tasks[i], frames[i]) for i in sorted(frames)], errors
 
 # ================== UI: FILTRY POBIERANIA ==================
 c1, c2 = st.columns([2, 3], gap="large")
 
+# rekord z wyszukiwarki na stronie głównej: zakres (państwo|scheme) z lokalnej kopii, w której jest
+goto_scope = st.session_state.pop("b_goto_scope", None)
+
 with c1:
     countries = breeam_countries()
-    opts_c = ["(dowolne)"] + countries
-    idx_pl = opts_c.index("Poland") if "Poland" in opts_c else 0
-    sel_country_lbl = st.selectbox("Państwo (API)", opts_c, index=idx_pl, key="b_country")
-    sel_country = None if sel_country_lbl == "(dowolne)" else sel_country_lbl
+    default_c = ["Poland"] if "Poland" in countries else []
+    if goto_scope:
+        goto_country = goto_scope.split("|", 1)[0]
+        st.session_state["b_countries"] = [] if goto_country == "*" else [goto_country]
+    sel_countries = st.multiselect(
+        "Państwa (API)", countries, key="b_countries",
+        # wartość już w session_state (np. z wyszukiwarki) – bez default, inaczej Streamlit ostrzega
+        default=None if "b_countries" in st.session_state else default_c,
+        help="Puste = dowolne państwo.",
+    )
 
 df_schemes, schemes_raw = breeam_schemes_df()
 
@@ -317,40 +164,107 @@ with c2:
         if df_inuse.empty:
             df_inuse = df_schemes.copy()
 
-        opts_s = df_inuse["schemeName"].tolist()
-        default_idx = 0
-        for i, nm in enumerate(opts_s):
-            if str(nm).strip().lower() == "in-use":
-                default_idx = i
-                break
-
-        sel_scheme_name = st.selectbox("Rodzaj certyfikacji (scheme)", opts_s, index=default_idx, key="b_scheme")
-        scheme_row = df_inuse.loc[df_inuse["schemeName"] == sel_scheme_name].head(1)
-        sel_scheme_id = scheme_row["schemeID"].iloc[0]
-        try:
-            sel_scheme_id = int(sel_scheme_id)
-        except Exception:
-            sel_scheme_id = None
+        opts_s = list(dict.fromkeys(df_inuse["schemeName"].tolist()))
+        default_s = [nm for nm in opts_s if str(nm).strip().lower() == "in-use"][:1] or opts_s[:1]
+        if goto_scope:
+            goto_sid = goto_scope.split("|", 1)[1]
+            goto_names = []
+            for sid, nm in zip(df_inuse["schemeID"], df_inuse["schemeName"]):
+                try:
+                    sid = int(sid)
+                except Exception:
+                    sid = None
+                # ten sam zapis co scope_key; "*" = bez scheme -> pusta lista
+                if str(sid) == goto_sid:
+                    goto_names.append(nm)
+            st.session_state["b_schemes"] = goto_names[:1]
+
+        sel_scheme_names = st.multiselect(
+            "Rodzaj certyfikacji (scheme)", opts_s, key="b_schemes",
+            default=None if "b_schemes" in st.session_state else default_s,
+            help="Można wybrać kilka (np. In-Use + sub-schemes) – zostaną pobrane równolegle.",
+        )
+        sel_schemes = []
+        for nm in sel_scheme_names:
+            sid = df_inuse.loc[df_inuse["schemeName"] == nm, "schemeID"].iloc[0]
+            try:
+                sid = int(sid)
+            except Exception:
+                sid = None
+            sel_schemes.append((sid, nm))
     else:
         # ZMIANA: zamiast ręcznego schemeID -> pobierz bez scheme (czyli /assessments)
         st.warning("Nie udało się zbudować listy scheme z /schemes. Pobiorę dane bez schemeID (endpoint /assessments).")
-        sel_scheme_id = None
+        sel_schemes = []
+
+def data_as_of(*calls) -> str:
+    """'dane z HH:MM' dla najstarszej z odpowiedzi breeam_get (+ informacja o odświeżaniu/błędzie)."""
+    stamps = [breeam_get.swr.fetched_at(*a) for a in calls]
+    stamps = [t for t in stamps if t is not None]
+    if not stamps:
+        return ""
+    txt = f"Listy państw i scheme: dane z {datetime.fromtimestamp(min(stamps)):%H:%M}"
+    if any(breeam_get.swr.is_refreshing(*a) for a in calls):
+        txt += " (odświeżanie w tle…)"
+    elif any(breeam_get.swr.last_error(*a) for a in calls):
+        txt += " (ostatnie odświeżenie nieudane – pokazuję poprzednie dane)"
+    return txt
+
+as_of = data_as_of(("/countries",), ("/schemes",))
+if as_of:
+    st.caption(as_of)
+
+sel_tasks = [
+    (c, sid, sname)
+    for c in (sel_countries or [None])
+    for sid, sname in (sel_schemes or [(None, "(bez scheme)")])
+]
+sel_scopes = tuple(scope_key(c, sid) for c, sid, _ in sel_tasks)
+
+# lokalna kopia – strona otwiera się od razu, bez czekania na API
+if st.session_state.get("breeam_api_scopes") != sel_scopes:
+    df_local = load_breeam_local(sel_tasks)
+    st.session_state.breeam_api_raw = None if df_local.empty else df_local
+    st.session_state.breeam_api_scopes = sel_scopes
 
 left_btn, right_btn = st.columns([1, 1])
 
 if left_btn.button("Pobierz BREEAM z API", type="primary", key="btn_breeam"):
+    preview_box = st.empty()
+
+    def _show_preview(parts):
+        # pierwsze wiersze widoczne już w trakcie pobierania reszty
+        with preview_box.container():
+            st.caption(f"Pobrano dotąd: {sum(len(p) for p in parts):,} rekordów…")
+            st.dataframe(pd.concat(parts[:2], ignore_index=True).head(50), use_container_width=True)
+
     with st.spinner("Pobieram dane z BREEAM API..."):
-        df_api_raw = breeam_fetch_api(sel_country, sel_scheme_id)
-        df_api = normalize_breeam_from_api(df_api_raw)
-        df_api = compute_breeam_expiries(df_api)
+        parts, fetch_errors = breeam_fetch_many(
+            sel_countries or [None],
+            sel_schemes or [(None, "(bez scheme)")],
+            on_progress=_show_preview,
+        )
+        sync_stats = sync_breeam(parts)
+        df_api = load_breeam_local(sel_tasks)
+    preview_box.empty()
 
     st.session_state.breeam_api_raw = df_api
+    st.session_state.breeam_api_scopes = sel_scopes
 
     for k in ["b_pt_sel", "b_pt_multi", "b_view", "b_proj_sel"]:
         if k in st.session_state:
             del st.session_state[k]
 
     st.success(f"Pobrano rekordów z API: {len(df_api):,}")
+    st.caption(
+        f"Synchronizacja z lokalną kopią – nowe: {sync_stats['added']:,}, "
+        f"zmienione: {sync_stats['changed']:,}, usunięte: {sync_stats['removed']:,}"
+    )
+    if fetch_errors:
+        st.warning(
+            "Nie udało się pobrać części zestawów (pozostałe dane są w tabeli):\n\n"
+            + "\n".join(f"- {e}" for e in fetch_errors)
+        )
 
 if right_btn.button("Reset filtrów", key="btn_breeam_reset"):
     for k in ["b_pt_sel", "b_pt_multi", "b_view", "b_proj_sel"]:
@@ -359,35 +273,60 @@ if right_btn.button("Reset filtrów", key="btn_breeam_reset"):
     st.success("Filtry zresetowane.")
 
 # ================== DIAGNOSTYKA ==================
-with st.expander("Diagnostyka: /schemes + /countries + sample /assessments", expanded=False):
-    st.write("BREEAM_BASE:", BREEAM_BASE)
-    st.write("df_schemes rows:", int(len(df_schemes)))
-    st.write("df_schemes cols:", list(df_schemes.columns) if isinstance(df_schemes, pd.DataFrame) else "—")
-    if isinstance(df_schemes, pd.DataFrame) and not df_schemes.empty:
-        st.dataframe(df_schemes.head(20), use_container_width=True)
-
-    st.markdown("**/schemes raw (pierwsze ~1200 znaków):**")
-    try:
-        raw_txt = json.dumps(schemes_raw, ensure_ascii=False)
-        st.code(raw_txt[:1200] + ("…" if len(raw_txt) > 1200 else ""), language="json")
-    except Exception as e:
-        st.write("Nie udało się pokazać JSON:", e)
-
-    try:
-        c_raw = breeam_get("/countries")
+def json_preview(obj, limit: int) -> str:
+    """Pierwsze `limit` znaków JSON – serializacja przerywana po osiągnięciu limitu (bez dump całości)."""
+    out, n = [], 0
+    for piece in json.JSONEncoder(ensure_ascii=False, default=str).iterencode(obj):
+        out.append(piece)
+        n += len(piece)
+        if n > limit:
+            return "".join(out)[:limit] + "…"
+    return "".join(out)
+
+# przełącznik zamiast expandera: zawartość expandera liczy się przy każdym rerunie, nawet zwinięta
+if st.toggle("Diagnostyka: /schemes + /countries + /assessments + telemetria API", key="b_diag"):
+    with st.container(border=True):
+        st.write("BREEAM_BASE:", BREEAM_BASE)
+        st.write("df_schemes rows:", int(len(df_schemes)))
+        st.write("df_schemes cols:", list(df_schemes.columns) if isinstance(df_schemes, pd.DataFrame) else "—")
+        if isinstance(df_schemes, pd.DataFrame) and not df_schemes.empty:
+            st.dataframe(df_schemes.head(20), use_container_width=True)
+
+        # podglądy z odpowiedzi już w cache – bez nowych zapytań do API
+        st.markdown("**/schemes raw (pierwsze ~1200 znaków):**")
+        st.code(json_preview(schemes_raw, 1200), language="json")
+
         st.markdown("**/countries raw (pierwsze ~800 znaków):**")
-        c_txt = json.dumps(c_raw, ensure_ascii=False)
-        st.code(c_txt[:800] + ("…" if len(c_txt) > 800 else ""), language="json")
-    except Exception as e:
-        st.write("Błąd /countries:", e)
-
-    try:
-        a_raw = breeam_get("/assessments", params={"country": sel_country} if sel_country else None)
-        st.markdown("**/assessments raw (pierwsze ~800 znaków):**")
-        a_txt = json.dumps(a_raw, ensure_ascii=False)
-        st.code(a_txt[:800] + ("…" if len(a_txt) > 800 else ""), language="json")
-    except Exception as e:
-        st.write("Błąd /assessments:", e)
+        try:
+            st.code(json_preview(breeam_get("/countries"), 800), language="json")
+        except Exception as e:
+            st.write("Błąd /countries:", e)
+
+        st.markdown("**/assessments – pierwsze rekordy z pobranych danych (~800 znaków):**")
+        df_loaded = st.session_state.get("breeam_api_raw")
+        if df_loaded is not None and not df_loaded.empty:
+            st.code(json_preview(df_loaded.head(3).to_dict("records"), 800), language="json")
+        else:
+            st.caption("Brak pobranych danych.")
+
+        st.markdown("**Telemetria API (ten proces):**")
+        tele = telemetry.summary()
+        if tele.empty:
+            st.caption("Brak zarejestrowanych wywołań.")
+        else:
+            st.dataframe(
+                tele.rename(columns={
+                    "calls": "wywołania", "hits": "cache hit", "misses": "cache miss",
+                    "avg_s": "śr. czas [s]", "p95_s": "p95 [s]", "bytes": "bajty",
+                    "retries": "ponowienia", "errors": "błędy",
+                }),
+                use_container_width=True,
+                hide_index=True,
+            )
+            with st.expander("Ostatnie zdarzenia", expanded=False):
+                ev = telemetry.events().tail(50).iloc[::-1].copy()
+                ev["ts"] = pd.to_datetime(ev["ts"], unit="s")
+                st.dataframe(ev, use_container_width=True, hide_index=True)
 
 st.divider()
 
@@ -396,22 +335,40 @@ if "breeam_api_raw" not in st.session_state or st.session_state.breeam_api_raw i
     st.info("Brak danych. Kliknij **Pobierz BREEAM z API**.")
     st.stop()
 
-df = st.session_state.breeam_api_raw.copy()
+# wspólna ramka bazowa – filtry to przecięcia bitmap, kopia powstaje dopiero dla widocznego wycinka
+df = st.session_state.breeam_api_raw
+
+
+def build_breeam_index(df: pd.DataFrame) -> BitmapIndex:
+    index = BitmapIndex(len(df))
+    if "projectType" in df.columns:
+        index.add_values("projectType", df["projectType"].astype(str).str.strip().replace("nan", pd.NA))
+    m = pd.to_numeric(df.get("months_to_expiry", pd.Series([None] * len(df), index=df.index)), errors="coerce")
+    return index.add_masks("months", expiry_buckets(m))
+
+
+# indeksy raz na ramkę (nowa ramka po zmianie zakresu albo pobraniu z API), nie przy każdym przebiegu
+if st.session_state.get("breeam_api_index", (None,))[0] is not df:
+    st.session_state.breeam_api_index = (
+        df,
+        build_breeam_index(df),
+        build_search_index(df, "asset_name", key_candidates=("certificate_number",), detail_col="city"),
+    )
+_, filter_index, search_index = st.session_state.breeam_api_index
+flt = FilterMask(df, filter_index)
+
+last_synced = get_assessment_store().last_sync(list(sel_scopes))
+if last_synced:
+    st.caption(
+        "Dane z lokalnej kopii – ostatnia synchronizacja: "
+        + datetime.fromtimestamp(min(last_synced.values())).strftime("%Y-%m-%d %H:%M")
+    )
 
 # ================== FILTR projectType ==================
 st.markdown("## Filtr – typ projektu")
 
 if "projectType" in df.columns:
-    types = (
-        df["projectType"]
-        .astype(str)
-        .str.strip()
-        .replace("nan", pd.NA)
-        .dropna()
-        .unique()
-        .tolist()
-    )
-    types = sorted(types)
+    types = filter_index.options("projectType")
 
     if "b_pt_sel" not in st.session_state or st.session_state.b_pt_sel is None:
         st.session_state.b_pt_sel = types[:]
@@ -428,23 +385,21 @@ if "projectType" in df.columns:
     st.session_state.b_pt_sel = sel_types
 
     if sel_types:
-        df = df[df["projectType"].astype(str).str.strip().isin(sel_types)].copy()
+        flt.where_in("projectType", sel_types)
     else:
-        df = df.iloc[0:0].copy()
+        flt.none()
 
-    st.caption(f"Po filtrze: **{len(df):,}** rekordów.")
+    st.caption(f"Po filtrze: **{flt.count():,}** rekordów.")
 else:
     st.warning("Brak kolumny projectType w danych z API.")
 
 # ================== METRYKI + FILTR OKRESÓW ==================
 st.markdown("## Podsumowanie")
-total = len(df)
-m = pd.to_numeric(df.get("months_to_expiry", pd.Series([None] * len(df))), errors="coerce")
-
-urgent_0_6 = int(m.between(0, 6, inclusive="both").sum())
-urgent_6_12 = int(m.between(7, 12, inclusive="both").sum())
-mid_12_18 = int(m.between(12, 18, inclusive="both").sum())
-over_18 = int((m > 18).sum())
+total = flt.count()
+urgent_0_6 = flt.count(filter_index.bitmap("months", ["≤ 6 mies."]))
+urgent_6_12 = flt.count(filter_index.bitmap("months", ["6–12 mies."]))
+mid_12_18 = flt.count(filter_index.bitmap("months", ["12–18 mies."]))
+over_18 = flt.count(filter_index.bitmap("months", ["> 18 mies."]))
 
 c1, c2, c3, c4, c5 = st.columns(5)
 c1.metric("Liczba certyfikacji", f"{total:,}")
@@ -460,15 +415,8 @@ view = st.radio(
     key="b_view",
 )
 
-m_all = pd.to_numeric(df.get("months_to_expiry", pd.Series([None] * len(df))), errors="coerce")
-if view == "≤ 6 mies.":
-    df = df[m_all.between(0, 6, inclusive="both")].copy()
-elif view == "6–12 mies.":
-    df = df[m_all.between(7, 12, inclusive="both")].copy()
-elif view == "12–18 mies.":
-    df = df[m_all.between(12, 18, inclusive="both")].copy()
-elif view == "> 18 mies.":
-    df = df[m_all > 18].copy()
+if view != "Wszystkie":
+    flt.where_in("months", [view])
 
 st.divider()
 
@@ -485,21 +433,23 @@ visible_cols = [
     "expiry_status",
     "assessor",
 ]
-present = [c for c in visible_cols if c in df.columns]
-df_view = df[present].copy()
+# przy pobraniu kilku państw / scheme pokaż też źródło rekordu
+visible_cols += [c for c in ("source_country", "source_scheme") if c in df.columns and flt.column(c).nunique() > 1]
+# jedyna kopia danych: przefiltrowane wiersze, tylko widoczne kolumny
+df_view = flt.frame(visible_cols)
 
-st.dataframe(df_view.style.apply(color_rows_by_expiry, axis=1), use_container_width=True)
+render_expiry_table(df_view, key="b_table")
 
 # ================== SZCZEGÓŁY + MAPA ==================
 st.markdown("## Szczegóły wybranego certyfikatu")
 
-if df.empty:
+if flt.count() == 0:
     st.info("Brak wyników po zastosowaniu filtrów.")
 else:
-    name_col = "asset_name" if "asset_name" in df.columns else df.columns[0]
-    name_options = df[name_col].astype(str).fillna("(brak nazwy)").tolist()
-    sel_name = st.selectbox("Wybierz projekt", name_options, index=0, key="b_proj_sel")
-    row = df[df[name_col].astype(str) == sel_name].head(1).iloc[0]
+    pos = project_picker(search_index, key="b_proj_sel", within=flt.mask)
+    if pos is None:
+        st.stop()
+    row = df.iloc[pos]
 
     col_info, col_map = st.columns([3, 5], gap="large")
 
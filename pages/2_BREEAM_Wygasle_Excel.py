@@ -1,20 +1,21 @@
 # pages/2_BREEAM_Wygasle_Excel.py
 import os, re
 import pandas as pd
-from datetime import date
-from dateutil import parser as dtparser
 import streamlit as st
 
-# --- geokodowanie (opcjonalne) ---
-GEOCODING_AVAILABLE = True
-try:
-    from geopy.geocoders import Nominatim
-    from geopy.extra.rate_limiter import RateLimiter
-except Exception:
-    GEOCODING_AVAILABLE = False
+from utils.datasets import DATASETS, load_breeam_excel
+from utils.frames import memory_caption
+from utils.gazetteer import get_gazetteer
+from utils.geocode_worker import BACKGROUND_GEOCODING, get_geocode_worker
+from utils.geocoding import GEOCODING_AVAILABLE, geocode_with_cache, get_nominatim_geocoder
+from utils.prewarm import start_prewarm
+from utils.search import build_search_index, project_picker
+from utils.table import render_expiry_table
 
 # ================== UI / NAV ==================
 st.set_page_config(page_title="BREEAM wygasłe", layout="wide")
+# rozgrzewanie cache także przy wejściu prosto na tę stronę (raz na proces)
+start_prewarm()
 
 def nav_buttons(active: str = "breeam_exp"):
     c1, c2, c3, c4 = st.columns(4, gap="medium")
@@ -44,98 +45,8 @@ if not os.path.exists(BREEAM_HIST_PATH):
     st.error(f"Brak pliku: {BREEAM_HIST_PATH}")
     st.stop()
 
-# ================== HELPERY: DATY ==================
-DATE_RX = re.compile(
-    r"(\d{4}[-/\.]\d{1,2}[-/\.]\d{1,2})|"
-    r"(\d{1,2}[-/\.]\d{1,2}[-/\.]\d{2,4})|"
-    r"(\d{4}[-/\.]\d{1,2})"
-)
-
-def parse_date_any(x):
-    if x is None or (isinstance(x, float) and pd.isna(x)):
-        return None
-    s = str(x).strip()
-    if not s:
-        return None
-    try:
-        return dtparser.parse(s, dayfirst=True, fuzzy=True).date()
-    except Exception:
-        pass
-    m = DATE_RX.search(s)
-    if m:
-        try:
-            return dtparser.parse(m.group(0), dayfirst=True).date()
-        except Exception:
-            return None
-    return None
-
-def months_left_signed(d):
-    if d is None or pd.isna(d):
-        return None
-    t = date.today()
-    m = (d.year - t.year) * 12 + (d.month - t.month)
-    if d >= t and d.day > t.day:
-        m += 1
-    elif d < t and d.day < t.day:
-        m -= 1
-    return int(m)
-
-def add_expiry_status(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    def status(m):
-        if pd.isna(m): return "❓ Brak daty"
-        m = int(m)
-        if m < 0: return "⛔ Wygasły"
-        if m <= 6: return "🔴 ≤ 6 mies."
-        if m <= 12: return "🟠 6–12 mies."
-        if m <= 18: return "🟡 12–18 mies."
-        return "✅ > 18 mies."
-    df["expiry_status"] = df.get("months_to_expiry", pd.Series([None]*len(df))).apply(status)
-    return df
-
-def color_rows_by_expiry(row):
-    m = row.get("months_to_expiry", None)
-    if pd.isna(m):
-        return [""] * len(row)
-    m = int(m)
-    if m < 0: color = "#ffcccc"
-    elif m <= 6: color = "#ffe0cc"
-    elif m <= 12: color = "#fff2cc"
-    elif m <= 18: color = "#fff7cc"
-    else: color = "#e6ffea"
-    return [f"background-color: {color}"] * len(row)
-
+# ================== HELPERY ==================
 # ================== NORMALIZACJA EXCEL ==================
-def normalize_breeam_from_excel(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    rename_excel = {
-        "Nazwa budynku": "asset_name",
-        "Rodzaj budynku": "projectType",
-        "System": "system",
-        "Standard": "standard",
-        "Scheme": "scheme",
-        "Rating": "rating",
-        "Status/Data ważności": "stage",
-        "Województwo": "region",
-        "Miasto": "city",
-        "Adres": "regAddresLine1",
-        "Audytor/Assesor": "assessor",
-        "Assessor/Auditor": "assessor",
-        "Assessor": "assessor",
-        "Kraj": "country",
-        "Country": "country",
-        # czasem:
-        "Kod pocztowy": "postcode",
-        "Postcode": "postcode",
-        "Zipcode": "postcode",
-    }
-    for src, dst in rename_excel.items():
-        if src in df.columns:
-            df.rename(columns={src: dst}, inplace=True)
-    if "system" not in df.columns:
-        df["system"] = "BREEAM"
-    return df
-
 def _clean_token(x):
     if x is None or (isinstance(x, float) and pd.isna(x)):
         return ""
@@ -188,53 +99,70 @@ def build_address_variants(row: pd.Series) -> list[str]:
 # ================== GEOKODOWANIE (tylko wybrany rekord) ==================
 @st.cache_resource
 def get_geocoder(provider: str):
-    if not GEOCODING_AVAILABLE:
-        return None
-    if provider == "nominatim":
-        geolocator = Nominatim(user_agent="breeam_expired_excel_app")
-        return RateLimiter(geolocator.geocode, min_delay_seconds=1)
+    if provider == "gazetteer":
+        # offline: kody pocztowe / miasta / województwa z lokalnego pliku, bez sieci i limitu zapytań
+        return get_gazetteer()
+    # wspólny limiter procesu (utils.geocoding) – ten sam dla strony LEED i workera w tle;
     # miejsce na przyszłe providery, ale na razie używamy tylko Nominatim
-    geolocator = Nominatim(user_agent="breeam_expired_excel_app")
-    return RateLimiter(geolocator.geocode, min_delay_seconds=1)
+    return get_nominatim_geocoder()
 
-@st.cache_data(show_spinner=False, ttl=60*60*24)
-def geocode_variants_cached(address_variants: tuple, provider: str):
+# punkty gazeteru: rodzaj -> (opis dla użytkownika, zoom mapy)
+APPROXIMATE_KINDS = {
+    "postcode": ("środek obszaru kodu pocztowego", 12),
+    "city": ("środek miejscowości", 10),
+    "voivodeship": ("środek województwa", 6),
+}
+
+def geocode_variants_cached(address_variants: tuple, provider: str, offline_only: bool = False):
     """
-    Cache per (warianty adresu, provider).
-    Zwraca (lat, lon, matched_address) lub (None, None, None)
+    Trwały cache per (adres, provider) – wspólny ze stroną LEED.
+    Warianty zgrubne (miasto / województwo / kod pocztowy) rozwiązuje lokalny gazeter,
+    adresy z ulicą idą do geokodera sieciowego.
+    offline_only=True: tylko cache + gazeter, bez zapytań do sieci.
+    Zwraca (lat, lon, matched_address, kind) lub (None, None, None, None);
+    kind: "address" (geokoder / cache) albo rodzaj punktu gazeteru ("postcode" / "city" / "voivodeship").
     """
-    if not GEOCODING_AVAILABLE:
-        return None, None, None
-    geocode = get_geocoder(provider)
-    if geocode is None:
-        return None, None, None
+    gazetteer = get_geocoder("gazetteer")
+    geocode = None if offline_only else get_geocoder(provider)
 
     for addr in address_variants:
-        try:
-            loc = geocode(addr)
-        except Exception:
-            loc = None
+        loc = gazetteer(addr) if gazetteer is not None else None
         if loc:
-            return float(loc.latitude), float(loc.longitude), addr
+            return float(loc.latitude), float(loc.longitude), addr, loc.kind
+        lat, lon = geocode_with_cache(addr, geocode, provider, offline_only=offline_only)
+        if lat is not None and lon is not None:
+            return lat, lon, addr, "address"
 
-    return None, None, None
+    return None, None, None, None
 
 # ================== LOAD & PREP ==================
-df_raw = pd.read_excel(BREEAM_HIST_PATH, engine="openpyxl")
-df = normalize_breeam_from_excel(df_raw)
-
-# expiry zawsze od 'stage'
-if "stage" in df.columns:
-    parsed = df["stage"].map(parse_date_any)
-    df["expiry_date"] = pd.to_datetime(parsed, errors="coerce").dt.date
-else:
-    df["expiry_date"] = None
-
-df["months_to_expiry"] = df["expiry_date"].map(months_left_signed)
-df = add_expiry_status(df)
+# wspólne dla wszystkich sesji; przeliczane tylko po zmianie pliku (mtime)
+df = DATASETS.get("breeam_excel", BREEAM_HIST_PATH, load_breeam_excel)
 
 expired = df[df["months_to_expiry"].notna() & (df["months_to_expiry"] < 0)].copy()
 st.success(f"Wygasłe rekordy (na dziś): {len(expired):,}")
+st.caption(memory_caption(df))
+
+# ================== GEOKODOWANIE W TLE (cały plik) ==================
+if GEOCODING_AVAILABLE and BACKGROUND_GEOCODING:
+    worker = get_geocode_worker("nominatim")
+    file_version = os.path.getmtime(BREEAM_HIST_PATH)
+    if not worker.is_submitted("breeam_excel", file_version):
+        # najpierw rekordy widoczne na tej stronie (wygasłe), potem reszta pliku
+        ordered = pd.concat([expired, df.drop(index=expired.index)])
+        # warianty zgrubne rozwiązuje offline gazeter – do sieci idą tylko adresy z ulicą
+        gazetteer = get_geocoder("gazetteer")
+        jobs = [
+            [a for a in build_address_variants(r) if gazetteer is None or gazetteer(a) is None]
+            for _, r in ordered.iterrows()
+        ]
+        worker.submit("breeam_excel", file_version, jobs)
+    geo_p = worker.progress("breeam_excel")
+    if geo_p["total"] and geo_p["done"] < geo_p["total"]:
+        st.progress(
+            geo_p["done"] / geo_p["total"],
+            text=f"Geokodowanie w tle: {geo_p['done']:,}/{geo_p['total']:,} adresów (znaleziono: {geo_p['found']:,})",
+        )
 
 # ================== TABELA ==================
 show_cols = ["asset_name","projectType","standard","scheme","expiry_date","months_to_expiry","expiry_status","assessor"]
@@ -242,7 +170,7 @@ for c in show_cols:
     if c not in expired.columns:
         expired[c] = None
 expired_view = expired[show_cols].copy()
-st.dataframe(expired_view.style.apply(color_rows_by_expiry, axis=1), use_container_width=True)
+render_expiry_table(expired_view, key="bx_table")
 
 # ================== SZCZEGÓŁY + MAPA ==================
 st.markdown("## Szczegóły wybranego certyfikatu")
@@ -251,14 +179,23 @@ if expired.empty:
     st.info("Brak wygasłych rekordów.")
     st.stop()
 
-name_col = "asset_name" if "asset_name" in expired.columns else None
-if not name_col:
+if "asset_name" not in expired.columns:
     st.error("Brak kolumny z nazwą (asset_name).")
     st.stop()
 
-name_options = expired[name_col].astype(str).fillna("(brak nazwy)").tolist()
-sel_name = st.selectbox("Wybierz projekt", name_options, index=0, key="exp_proj_sel")
-row = expired[expired[name_col].astype(str) == sel_name].head(1).iloc[0]
+
+@st.cache_resource(max_entries=4)
+def breeam_excel_search_index(mtime: float, n_rows: int, _df: pd.DataFrame):
+    # plik nie ma numeru certyfikatu – kluczem jest etykieta wiersza ramki (stała dla wersji pliku)
+    return build_search_index(_df, "asset_name", detail_col="city")
+
+
+search_index = breeam_excel_search_index(os.path.getmtime(BREEAM_HIST_PATH), len(df), df)
+pos = project_picker(search_index, key="exp_proj_sel", within=df.index.isin(expired.index))
+if pos is None:
+    st.stop()
+row = df.iloc[pos]
+sel_id = search_index.keys[pos]
 
 col_info, col_map = st.columns([3, 5], gap="large")
 
@@ -284,7 +221,7 @@ with col_info:
 with col_map:
     st.write("**Mapa lokalizacji**")
 
-    if not GEOCODING_AVAILABLE:
+    if not GEOCODING_AVAILABLE and get_geocoder("gazetteer") is None:
         st.info("Geokodowanie niedostępne — zainstaluj `geopy`, aby włączyć mapę z adresu.")
         st.stop()
 
@@ -301,7 +238,7 @@ with col_map:
 
     # --- KLUCZ: zaktualizuj text_input gdy zmienił się projekt ---
     # (streamlit nie nadpisuje wartości inputa, jeśli istnieje session_state pod tym samym key)
-    sel_key = f"geo_addr_for_{sel_name}"  # unikalnie per wybrany projekt
+    sel_key = f"geo_addr_for_{sel_id}"  # unikalnie per wybrany projekt
     if sel_key not in st.session_state:
         st.session_state[sel_key] = default_addr
 
@@ -329,20 +266,28 @@ with col_map:
 
     provider = "nominatim"
 
-    if st.button("📍 Ustal lokalizację", type="primary", use_container_width=True, key=f"geo_btn_{sel_name}"):
+    # znane adresy (trwały cache) -> mapa od razu, bez zapytania do sieci
+    lat, lon, matched, kind = geocode_variants_cached(tuple(uniq), provider, offline_only=True)
+
+    clicked = st.button("📍 Ustal lokalizację", type="primary", use_container_width=True, key=f"geo_btn_{sel_id}")
+    if clicked:
         with st.spinner("Geokoduję adres…"):
-            lat, lon, matched = geocode_variants_cached(tuple(uniq), provider)
+            lat, lon, matched, kind = geocode_variants_cached(tuple(uniq), provider)
 
-        if lat is not None and lon is not None:
+    if lat is not None and lon is not None:
+        approx = APPROXIMATE_KINDS.get(kind)
+        if approx is None:
             st.success(f"Znaleziono lokalizację dla: {matched}")
             st.map(pd.DataFrame({"lat": [lat], "lon": [lon]}))
         else:
-            st.warning("Nie udało się ustalić lokalizacji (geokoder nie zwrócił wyniku).")
-            st.caption("Spróbuj uprościć adres, usunąć województwo albo dopisać kod pocztowy.")
-            with st.expander("Pokaż użyte warianty adresu"):
-                for a in uniq[:15]:
-                    st.write(a)
-
-
-
-
+            # punkt z gazeteru offline to środek obszaru, nie budynek – mapa oddalona, opis wprost
+            label, zoom = approx
+            st.warning(f"Lokalizacja przybliżona – {label} ({matched}), nie adres projektu. "
+                       "Kliknij „Ustal lokalizację”, aby geokodować adres z ulicą.")
+            st.map(pd.DataFrame({"lat": [lat], "lon": [lon]}), zoom=zoom)
+    elif clicked:
+        st.warning("Nie udało się ustalić lokalizacji (geokoder nie zwrócił wyniku).")
+        st.caption("Spróbuj uprościć adres, usunąć województwo albo dopisać kod pocztowy.")
+        with st.expander("Pokaż użyte warianty adresu"):
+            for a in uniq[:15]:
+                st.write(a)
@@ -1,19 +1,21 @@
 # pages/3_LEED_Excel.py
 import os
-import re
-import pandas as pd
 from datetime import date
-from dateutil import parser as dtparser
-from dateutil.relativedelta import relativedelta
+
+import pandas as pd
 import streamlit as st
 
-# geokodowanie – wymaga: pip install geopy
-try:
-    from geopy.geocoders import Nominatim
-    from geopy.extra.rate_limiter import RateLimiter
-    GEOCODING_AVAILABLE = True
-except ImportError:
-    GEOCODING_AVAILABLE = False
+from utils.datasets import leed_columns, load_leed_df
+from utils.dates import parse_dates
+from utils.expiry import add_expiry_columns, add_years
+from utils.filters import BitmapIndex, FilterMask, expiry_buckets
+from utils.frames import memory_caption, rename_columns
+from utils.geocode_worker import BACKGROUND_GEOCODING, get_geocode_worker
+from utils.geocoding import GEOCODING_AVAILABLE, geocode_with_cache, get_nominatim_geocoder
+from utils.prewarm import start_prewarm
+from utils.search import build_search_index, project_picker
+from utils.sources import LEED_CORE_COLUMNS, LEED_RENAME
+from utils.table import render_paged_table
 
 
 # ================== NAV BUTTONS ==================
@@ -39,6 +41,8 @@ LEED_PATH = r"PublicLEEDProjectDirectory.xlsx"
 
 # ================== PAGE ==================
 st.set_page_config(page_title="LEED", layout="wide")
+# rozgrzewanie cache także przy wejściu prosto na tę stronę (raz na proces)
+start_prewarm()
 nav_buttons("leed")
 st.divider()
 
@@ -47,82 +51,6 @@ st.title("📄 LEED")
 
 
 # ================== HELPERY ==================
-DATE_RX = re.compile(
-    r"(\d{4}[-/\.]\d{1,2}[-/\.]\d{1,2})|"
-    r"(\d{1,2}[-/\.]\d{1,2}[-/\.]\d{2,4})|"
-    r"(\d{4}[-/\.]\d{1,2})"
-)
-
-def parse_date_any(x):
-    if x is None or (isinstance(x, float) and pd.isna(x)):
-        return None
-    s = str(x).strip()
-    if not s:
-        return None
-    try:
-        return dtparser.parse(s, dayfirst=False, fuzzy=True).date()
-    except Exception:
-        pass
-    m = DATE_RX.search(s)
-    if m:
-        try:
-            return dtparser.parse(m.group(0), dayfirst=False).date()
-        except Exception:
-            return None
-    return None
-
-
-def months_left_signed(d):
-    """ >0 – ważny, 0 – wygasa w bieżącym miesiącu, <0 – wygasły """
-    if d is None or pd.isna(d):
-        return None
-    t = date.today()
-    m = (d.year - t.year) * 12 + (d.month - t.month)
-    if d >= t and d.day > t.day:
-        m += 1
-    elif d < t and d.day < t.day:
-        m -= 1
-    return int(m)
-
-
-def add_expiry_status_leed(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-
-    def status(m):
-        if pd.isna(m):
-            return "❓ Brak daty"
-        m = int(m)
-        if m < 0:
-            return "⛔ Wygasły"
-        if m <= 6:
-            return "🔴 ≤ 6 mies."
-        if m <= 12:
-            return "🟠 6–12 mies."
-        if m <= 18:
-            return "🟡 12–18 mies."
-        return "✅ > 18 mies."
-
-    df["expiry_status"] = df.get("months_to_expiry", pd.Series([None] * len(df))).apply(status)
-    return df
-
-
-def color_rows_by_expiry(row):
-    m = row.get("months_to_expiry", None)
-    if pd.isna(m):
-        return [""] * len(row)
-    m = int(m)
-    if m < 0:
-        color = "#ffcccc"
-    elif m <= 6:
-        color = "#ffe0cc"
-    elif m <= 12:
-        color = "#fff2cc"
-    elif m <= 18:
-        color = "#fff7cc"
-    else:
-        color = "#e6ffea"
-    return [f"background-color: {color}"] * len(row)
-
 
 def first_nonempty(row: pd.Series, candidates, default="–"):
     for c in candidates:
@@ -151,13 +79,9 @@ def years_for_version(version: str | None) -> int:
 
 
 # ================== GEOKODOWANIE (tylko wybrany rekord) ==================
-@st.cache_resource
 def get_geocoder():
-    if not GEOCODING_AVAILABLE:
-        return None
-    geolocator = Nominatim(user_agent="leed_app")
-    # limiter: bezpieczniej dla Nominatim
-    return RateLimiter(geolocator.geocode, min_delay_seconds=1)
+    # wspólny limiter procesu (utils.geocoding) – ten sam dla strony BREEAM wygasłe i workera w tle
+    return get_nominatim_geocoder()
 
 
 def build_address_for_geocoding(row: pd.Series) -> str:
@@ -177,21 +101,11 @@ def build_address_for_geocoding(row: pd.Series) -> str:
     return ", ".join([p for p in parts if p and p.lower() != "nan"])
 
 
-@st.cache_data(show_spinner=False, ttl=60 * 60 * 24)
 def geocode_address_cached(query: str):
-    """Cache po adresie, żeby nie odpalać geokodera wielokrotnie dla tego samego."""
+    """Trwały cache po adresie (SQLite, wspólny z BREEAM wygasłe) – geokoder tylko dla nowych adresów."""
     if not GEOCODING_AVAILABLE:
         return None, None
-    geocode = get_geocoder()
-    if geocode is None:
-        return None, None
-    try:
-        loc = geocode(query)
-    except Exception:
-        loc = None
-    if not loc:
-        return None, None
-    return float(loc.latitude), float(loc.longitude)
+    return geocode_with_cache(query, get_geocoder(), "nominatim")
 
 
 # ================== LOAD ==================
@@ -199,92 +113,99 @@ if not os.path.exists(LEED_PATH):
     st.error(f"Plik LEED nie istnieje pod ścieżką:\n\n{LEED_PATH}")
     st.stop()
 
-@st.cache_data(show_spinner=False)
-def load_leed_df(path: str) -> pd.DataFrame:
-    return pd.read_excel(path, engine="openpyxl")
+# leed_columns / load_leed_df (utils.datasets) – wspólny cache procesów/replik, wpis wygasa po dobie
+leed_mtime = os.path.getmtime(LEED_PATH)
+extra_options = [c for c in leed_columns(LEED_PATH, leed_mtime) if c not in LEED_CORE_COLUMNS]
+# wybór z widgetu w sekcji tabeli (stan z poprzedniego przebiegu)
+extra_cols = [c for c in st.session_state.get("l_extra_cols", []) if c in extra_options]
 
-df_raw = load_leed_df(LEED_PATH)
+df_raw = load_leed_df(LEED_PATH, leed_mtime, tuple(LEED_CORE_COLUMNS + extra_cols))
 st.success(f"Wczytano {len(df_raw):,} wierszy z pliku: {LEED_PATH}")
 
 
+st.caption(memory_caption(df_raw))
+
 # ================== NORMALIZACJA ==================
-df = df_raw.copy()
-
-rename_map = {
-    "Project Name": "asset_name",
-    "ProjectName": "asset_name",
-    "Name": "asset_name",
-    "Country": "country",
-    "City": "city",
-    "State/Province": "region",
-    "State": "region",
-    "LEEDSystemVersion": "LEEDSystemVersion",
-    "LEED System Version": "LEEDSystemVersion",
-    "LEED Rating System": "rating_system",
-    "Rating System": "rating_system",
-    "LEED Certification Level": "level",
-    "Certification Level": "level",
-    "Project ID": "project_id",
-    "ID": "project_id",
-    "URL": "publicUrl",
-    "Certification Date": "certification_date",
-    "CertDate": "certification_date",
-    "Award Date": "certification_date",
-    "Street": "Street",
-    "Zipcode": "Zipcode",
-}
-for src, dst in rename_map.items():
-    if src in df.columns and dst not in df.columns:
-        df[dst] = df[src]
+
+# zmiana nazw zamiast kopii kolumn (źródło nie zostaje obok celu)
+df = rename_columns(df_raw, LEED_RENAME)
 
 
 # ================== DATY: expiry zależnie od wersji ==================
 if "certification_date" in df.columns:
-    df["certification_date"] = pd.to_datetime(df["certification_date"].map(parse_date_any), errors="coerce").dt.date
+    df["certification_date"] = parse_dates(df["certification_date"], dayfirst=False).dt.date
 else:
     df["certification_date"] = None
 
-def calc_expiry(row):
-    d = row.get("certification_date", None)
-    if d is None or pd.isna(d):
-        return None
-    years = years_for_version(row.get("LEEDSystemVersion", None))
-    return d + relativedelta(years=years)
+def calc_expiry(df: pd.DataFrame) -> pd.Series:
+    # reguła wersja -> lata ważności liczona raz na każdą unikalną LEEDSystemVersion
+    if "LEEDSystemVersion" in df.columns:
+        versions = df["LEEDSystemVersion"].astype(object)
+        years_map = {v: years_for_version(v) for v in versions.dropna().unique()}
+        years = versions.map(years_map).fillna(years_for_version(None)).astype(int)
+    else:
+        years = pd.Series(years_for_version(None), index=df.index)
+    return add_years(df["certification_date"], years)
+
+df = add_expiry_columns(df, calc_expiry(df))
+
 
-df["expiry_date"] = df.apply(calc_expiry, axis=1)
-df["months_to_expiry"] = df["expiry_date"].map(months_left_signed)
-df = add_expiry_status_leed(df)
+# ================== GEOKODOWANIE W TLE (cały plik) ==================
+if GEOCODING_AVAILABLE and BACKGROUND_GEOCODING:
+    worker = get_geocode_worker("nominatim")
+    file_version = os.path.getmtime(LEED_PATH)
+    if not worker.is_submitted("leed", file_version):
+        worker.submit("leed", file_version, [(build_address_for_geocoding(r),) for _, r in df.iterrows()])
+    geo_p = worker.progress("leed")
+    if geo_p["total"] and geo_p["done"] < geo_p["total"]:
+        st.progress(
+            geo_p["done"] / geo_p["total"],
+            text=f"Geokodowanie w tle: {geo_p['done']:,}/{geo_p['total']:,} adresów (znaleziono: {geo_p['found']:,})",
+        )
 
 
 # ================== FILTRY ==================
-countries = sorted(df["country"].dropna().unique().tolist()) if "country" in df.columns else []
+@st.cache_resource(max_entries=4)
+def leed_index(mtime: float, day: str, n_rows: int, _df: pd.DataFrame) -> BitmapIndex:
+    # raz na wersję pliku i dzień (months_to_expiry zależy od daty), wspólny dla sesji;
+    # kolejność wierszy jak w arkuszu, więc bitmapy pasują do każdej projekcji kolumn
+    index = BitmapIndex(n_rows)
+    if "country" in _df.columns:
+        index.add_values("country", _df["country"])
+    if "LEEDSystemVersion" in _df.columns:
+        v = _df["LEEDSystemVersion"]
+        index.add_values("LEEDSystemVersion", v.astype(str).where(v.notna()))
+    index.add_masks("months", expiry_buckets(pd.to_numeric(_df["months_to_expiry"], errors="coerce")))
+    return index
+
+filter_index = leed_index(leed_mtime, date.today().isoformat(), len(df), df)
+
+countries = filter_index.options("country") if "country" in filter_index else []
 opts_c = ["(dowolne)"] + countries
 idx_pl = opts_c.index("Poland") if "Poland" in opts_c else 0
 sel_country = st.selectbox("Państwo", opts_c, index=idx_pl, key="l_country")
 
-mask = pd.Series([True] * len(df))
-if "country" in df.columns and sel_country != "(dowolne)":
-    mask &= (df["country"] == sel_country)
-df_f = df[mask].copy()
+# filtry = przecięcie bitmap z indeksu, bez kopii i bez skanowania kolumn
+flt = FilterMask(df, filter_index)
+if "country" in filter_index and sel_country != "(dowolne)":
+    flt.where_in("country", [sel_country])
 
-versions = sorted(df_f["LEEDSystemVersion"].dropna().astype(str).unique().tolist()) if "LEEDSystemVersion" in df_f.columns else []
+versions = flt.options("LEEDSystemVersion") if "LEEDSystemVersion" in filter_index else []
 opts_v = ["(dowolna)"] + versions
 sel_version = st.selectbox("LEEDSystemVersion", opts_v, index=0, key="l_version")
-if "LEEDSystemVersion" in df_f.columns and sel_version != "(dowolna)":
-    df_f = df_f[df_f["LEEDSystemVersion"].astype(str) == sel_version].copy()
+if "LEEDSystemVersion" in filter_index and sel_version != "(dowolna)":
+    flt.where_in("LEEDSystemVersion", [sel_version])
 
 
 # ================== METRYKI ==================
 st.markdown("### Podsumowanie")
 
-m = pd.to_numeric(df_f.get("months_to_expiry", pd.Series([None] * len(df_f))), errors="coerce")
-
-total = int(len(df_f))
-expired = int((m < 0).sum())
-urgent_0_6 = int(m.between(0, 6, inclusive="both").sum())
-urgent_6_12 = int(m.between(7, 12, inclusive="both").sum())
-mid_12_18 = int(m.between(12, 18, inclusive="both").sum())
-ok_18 = int((m > 18).sum())
+total = flt.count()
+expired = flt.count(filter_index.bitmap("months", ["Tylko wygasłe"]))
+urgent_0_6 = flt.count(filter_index.bitmap("months", ["≤ 6 mies."]))
+urgent_6_12 = flt.count(filter_index.bitmap("months", ["6–12 mies."]))
+mid_12_18 = flt.count(filter_index.bitmap("months", ["12–18 mies."]))
+ok_18 = flt.count(filter_index.bitmap("months", ["> 18 mies."]))
 
 c1, c2, c3, c4, c5, c6 = st.columns(6)
 c1.metric("Liczba certyfikacji", total)
@@ -310,61 +231,64 @@ view = st.radio(
     key="l_view",
 )
 
-if df_f.empty:
+if total == 0:
     st.info("Brak wyników dla wybranych filtrów.")
     st.stop()
 
-m_all = pd.to_numeric(df_f["months_to_expiry"], errors="coerce")
-
-if view == "Tylko wygasłe":
-    df_show = df_f[m_all < 0].copy()
-elif view == "≤ 6 mies.":
-    df_show = df_f[m_all.between(0, 6, inclusive="both")].copy()
-elif view == "6–12 mies.":
-    df_show = df_f[m_all.between(7, 12, inclusive="both")].copy()
-elif view == "12–18 mies.":
-    df_show = df_f[m_all.between(12, 18, inclusive="both")].copy()
-elif view == "> 18 mies.":
-    df_show = df_f[m_all > 18].copy()
-else:
-    df_show = df_f.copy()
+if view != "Wszystkie":
+    flt.where_in("months", [view])
 
 
 # ================== TABELA ==================
 st.divider()
 st.markdown("### Tabela (LEED)")
 
+# kolumny podstawowe z pliku (wczytywane zawsze) – w multiselect są tylko pozostałe
 preferred = [
     "asset_name",
+    "project_id",
     "Street",
     "city",
     "Zipcode",
+    "region",
     "country",
     "LEEDSystemVersion",
     "level",
+    "CertLevel",
     "certification_date",
     "expiry_date",
     "months_to_expiry",
     "expiry_status",
 ]
-cols = [c for c in preferred if c in df_show.columns] + [c for c in df_show.columns if c not in preferred]
-df_view = df_show[cols].copy()
+st.multiselect(
+    "Dodatkowe kolumny z pliku", extra_options, key="l_extra_cols",
+    help="Z pliku wczytywane są tylko kolumny potrzebne stronie i te wybrane tutaj.",
+)
+# pozostałe kolumny podstawowe obecne w pliku (np. Address) – po preferowanych, jak dotąd
+core_rest = [c for c in dict.fromkeys(LEED_RENAME.get(c, c) for c in LEED_CORE_COLUMNS) if c not in preferred]
+cols = [c for c in preferred + core_rest + extra_cols if c in df.columns]
 
-st.dataframe(df_view.style.apply(color_rows_by_expiry, axis=1), use_container_width=True)
+# jedyna kopia danych: przefiltrowane wiersze, tylko widoczne kolumny;
+# stronicowanie i sortowanie w pandas – do przeglądarki trafia tylko bieżąca strona
+render_paged_table(flt.frame(cols), key="l_table", sort_options=cols)
 
 # ================== SZCZEGÓŁY + MAPA ==================
 st.divider()
 st.markdown("## Szczegóły wybranego certyfikatu")
 
-if df_show.empty:
+if flt.count() == 0:
     st.info("Brak wyników po zastosowaniu filtrów.")
     st.stop()
 
-name_col = "asset_name" if "asset_name" in df_show.columns else df_show.columns[0]
-name_options = df_show[name_col].astype(str).fillna("(brak nazwy)").tolist()
-sel_name = st.selectbox("Wybierz projekt", name_options, index=0, key="l_proj_sel")
+@st.cache_resource(max_entries=4)
+def leed_search_index(mtime: float, n_rows: int, _df: pd.DataFrame):
+    # nazwy i ID zależą tylko od pliku – indeks wspólny dla sesji, budowany raz na wersję pliku
+    return build_search_index(_df, "asset_name", key_candidates=("project_id",), detail_col="city")
 
-row = df_show[df_show[name_col].astype(str) == sel_name].head(1).iloc[0]
+pos = project_picker(leed_search_index(leed_mtime, len(df), df), key="l_proj_sel", within=flt.mask)
+if pos is None:
+    st.stop()
+row = df.iloc[pos]
 
 col_info, col_map = st.columns([3, 5], gap="large")
 
@@ -0,0 +1,117 @@
+# tests/test_geocode_worker.py
+# Worker geokodowania w tle z lokalnym zamiennikiem geokodera: zgłoszenie, postęp,
+# ponowienia po błędzie sieci (bez blokowania kolejki) i wznowienie z trwałego cache SQLite.
+import os
+import threading
+import time
+from typing import NamedTuple
+
+import pytest
+
+from utils.geocode_worker import GeocodeWorker
+from utils.geocoding import GeocodeCache
+
+
+class _Location(NamedTuple):
+    latitude: float
+    longitude: float
+
+
+class _StandIn:
+    """Geokoder-atrapa: znane adresy -> punkt, `down` -> wyjątek sieci, `flaky` -> wyjątek przez `fail_times` wywołań."""
+
+    def __init__(self, known: dict, down=(), flaky=(), fail_times: int = 0):
+        self.known = known
+        self.down = set(down)
+        self.flaky = set(flaky)
+        self.fail_times = fail_times
+        self.calls: dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, address: str):
+        with self.lock:
+            n = self.calls[address] = self.calls.get(address, 0) + 1
+        if address in self.down or (address in self.flaky and n <= self.fail_times):
+            raise ConnectionError(f"stand-in: {address} niedostępny")
+        hit = self.known.get(address)
+        return _Location(*hit) if hit else None
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return GeocodeCache(os.path.join(tmp_path, "geocode.sqlite"))
+
+
+def test_submit_and_progress(cache):
+    geo = _StandIn({"Warszawa, Poland": (52.23, 21.01), "Kraków, Poland": (50.06, 19.94)})
+    worker = GeocodeWorker(geo, "stand-in", cache=cache, error_backoff=0.01)
+    jobs = [
+        ("ul. Nieznana 1, Warszawa, Poland", "Warszawa, Poland"),
+        ("Kraków, Poland",),
+        ("Atlantyda, Poland",),
+        ("Kraków, Poland",),  # duplikat – jedno zadanie
+    ]
+    worker.submit("ds", 1, jobs)
+    assert worker.is_submitted("ds", 1)
+    assert worker.join(timeout=5)
+
+    assert worker.progress("ds") == {"total": 3, "done": 3, "found": 2, "errors": 0}
+    # pierwszy trafiony wariant kończy zadanie; braki wyniku też trafiają do cache
+    assert cache.lookup("Warszawa, Poland", "stand-in") == (True, 52.23, 21.01)
+    assert cache.lookup("Atlantyda, Poland", "stand-in") == (True, None, None)
+
+
+def test_retry_then_give_up_without_blocking_queue(cache):
+    geo = _StandIn({"a": (1.0, 1.0), "flaky": (2.0, 2.0)}, down={"down"}, flaky={"flaky"}, fail_times=2)
+    worker = GeocodeWorker(geo, "stand-in", cache=cache, error_backoff=0.5, max_attempts=3)
+    worker.submit("ds", 1, [("down",), ("flaky",), ("a",)])
+
+    # rekord po błędzie czeka na ponowienie, ale kolejne rekordy idą od razu
+    deadline = time.monotonic() + 0.3
+    while geo.calls.get("a") is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert geo.calls.get("a") == 1
+    assert worker.progress("ds")["done"] == 1
+
+    assert worker.join(timeout=5)
+    assert geo.calls["flaky"] == 3
+    assert geo.calls["down"] == 3  # max_attempts, potem rezygnacja
+    assert worker.progress("ds") == {"total": 3, "done": 3, "found": 2, "errors": 1}
+    # błąd sieci nie jest zapisywany jako brak wyniku – następne zgłoszenie spróbuje ponownie
+    assert cache.lookup("down", "stand-in") == (False, None, None)
+
+
+def test_resume_from_sqlite_cache(tmp_path):
+    path = os.path.join(tmp_path, "geocode.sqlite")
+    jobs = [("Warszawa, Poland",), ("Gdańsk, Poland",), ("Atlantyda, Poland",)]
+    known = {"Warszawa, Poland": (52.23, 21.01), "Gdańsk, Poland": (54.35, 18.65)}
+
+    first = _StandIn(known)
+    worker = GeocodeWorker(first, "stand-in", cache=GeocodeCache(path), error_backoff=0.01)
+    worker.submit("ds", 1, jobs)
+    assert worker.join(timeout=5)
+    assert sum(first.calls.values()) == 3
+
+    # "restart": nowy worker i nowe połączenie do tego samego pliku – znane adresy bez geokodera
+    second = _StandIn(known)
+    resumed = GeocodeWorker(second, "stand-in", cache=GeocodeCache(path), error_backoff=0.01)
+    resumed.submit("ds", 1, jobs)
+    assert resumed.join(timeout=5)
+    assert second.calls == {}
+    assert resumed.progress("ds") == {"total": 3, "done": 3, "found": 2, "errors": 0}
+
+
+def test_new_version_drops_pending_jobs(cache):
+    release = threading.Event()
+
+    def slow(address):
+        release.wait(2)
+        return _Location(0.0, 0.0)
+
+    worker = GeocodeWorker(slow, "stand-in", cache=cache, error_backoff=0.01)
+    worker.submit("ds", 1, [(f"a{i}",) for i in range(5)])
+    worker.submit("ds", 2, [("b",)])
+    release.set()
+    assert worker.join(timeout=5)
+    assert worker.progress("ds") == {"total": 1, "done": 1, "found": 1, "errors": 0}
+    assert cache.lookup("a4", "stand-in") == (False, None, None)
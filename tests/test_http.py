@@ -0,0 +1,106 @@
+# tests/test_http.py
+# Wspólna Session (utils.http) na lokalnym serwerze-atrapie: ponowne użycie połączenia (keep-alive),
+# nagłówek Accept-Encoding i ponowienie 503 -> 200 w granicach skonfigurowanego backoffu.
+import gzip
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.http import HTTP_BACKOFF_FACTOR, default_timeout, get_session, make_session
+
+
+class _Stub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    lock = threading.Lock()
+    connections: set = set()
+    requests: list = []
+    # ścieżka -> ile pierwszych zapytań dostaje 503
+    unavailable: dict[str, int] = {}
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        with self.lock:
+            # port klienta identyfikuje połączenie TCP
+            self.connections.add(self.client_address)
+            self.requests.append((time.monotonic(), self.path, dict(self.headers)))
+            left = self.unavailable.get(self.path, 0)
+            if left:
+                self.unavailable[self.path] = left - 1
+        if left:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = b'{"ok": true}'
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_response(200)
+            self.send_header("Content-Encoding", "gzip")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def stub():
+    _Stub.connections = set()
+    _Stub.requests = []
+    _Stub.unavailable = {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _Stub.base = f"http://127.0.0.1:{server.server_port}"
+    yield _Stub
+    server.shutdown()
+    server.server_close()
+
+
+def test_session_reuses_connection(stub):
+    session = make_session()
+    for i in range(5):
+        r = session.get(f"{stub.base}/countries?i={i}", timeout=default_timeout())
+        assert r.json() == {"ok": True}
+    assert len(stub.requests) == 5
+    assert len(stub.connections) == 1
+    # jedna Session na proces
+    assert get_session() is get_session()
+
+
+def test_session_sends_accept_encoding(stub):
+    r = make_session().get(f"{stub.base}/schemes", timeout=default_timeout())
+    headers = stub.requests[-1][2]
+    assert "gzip" in headers["Accept-Encoding"]
+    assert headers["Accept"] == "application/json"
+    # odpowiedź skompresowana przez serwer jest rozpakowana przez requests
+    assert r.headers["Content-Encoding"] == "gzip"
+    assert r.json() == {"ok": True}
+
+
+def test_retry_503_then_200(stub):
+    stub.unavailable["/assessments"] = 2
+    session = make_session(retries=3)
+    t0 = time.monotonic()
+    r = session.get(f"{stub.base}/assessments", timeout=default_timeout())
+    elapsed = time.monotonic() - t0
+
+    assert r.status_code == 200
+    assert r.json() == {"ok": True}
+    assert len(stub.requests) == 3
+    # urllib3: backoff_factor * 2**(n-1) po kolejnych błędach (pierwsze ponowienie bez czekania)
+    expected = HTTP_BACKOFF_FACTOR * 2
+    assert elapsed < expected + 1.0
+    assert stub.requests[2][0] - stub.requests[1][0] >= expected * 0.9
+
+
+def test_retries_exhausted_returns_last_response(stub):
+    stub.unavailable["/down"] = 10
+    r = make_session(retries=1).get(f"{stub.base}/down", timeout=default_timeout())
+    # raise_on_status=False: wywołujący dostaje 503 i sam decyduje (raise_for_status w breeam_get)
+    assert r.status_code == 503
+    assert len(stub.requests) == 2
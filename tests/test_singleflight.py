@@ -0,0 +1,117 @@
+# tests/test_singleflight.py
+# Równoległe, identyczne zapytania do BREEAM API: jedno wywołanie lokalnego serwera-atrapy,
+# wynik (albo wyjątek) dla wszystkich czekających, kolejne wywołanie po błędzie idzie do API.
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# przed importem utils: osobne pliki cache i bez ponowień HTTP (każde wywołanie = jedno trafienie w serwer)
+_TMP = tempfile.mkdtemp(prefix="breeam_test_")
+os.environ["HTTP_CACHE_PATH"] = os.path.join(_TMP, "http.sqlite")
+os.environ["SHARED_CACHE_PATH"] = os.path.join(_TMP, "shared.sqlite")
+os.environ["BREEAM_STORE_PATH"] = os.path.join(_TMP, "store.sqlite")
+os.environ["HTTP_MAX_RETRIES"] = "0"
+
+from utils import breeam_api, http  # noqa: E402
+from utils.singleflight import SingleFlight  # noqa: E402
+
+CALLERS = 8
+
+
+class _Stub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits: dict[str, int] = {}
+    failing: set[str] = set()
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        with self.lock:
+            self.hits[path] = self.hits.get(path, 0) + 1
+        # odpowiedź w locie na tyle długo, żeby wszyscy wywołujący zdążyli dołączyć
+        time.sleep(0.3)
+        if path in self.failing:
+            self.send_response(500)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = f'{{"path": "{path}", "n": {self.hits[path]}}}'.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture(scope="module")
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    old_base, old_session = breeam_api.BREEAM_BASE, http._session
+    breeam_api.BREEAM_BASE = f"http://127.0.0.1:{server.server_port}/datav1"
+    # utils.http mógł być zaimportowany wcześniej (inny moduł testów) – Session bez ponowień wprost
+    http._session = http.make_session(retries=0)
+    yield _Stub
+    breeam_api.BREEAM_BASE, http._session = old_base, old_session
+    server.shutdown()
+
+
+def _unique_path() -> str:
+    # świeży klucz w cache (SWR / HTTP) dla każdego testu
+    return f"/countries/{uuid.uuid4().hex}"
+
+
+def _run_together(fn, n: int = CALLERS) -> list:
+    """n wątków startuje naraz; wynik albo wyjątek każdego z nich."""
+    barrier = threading.Barrier(n)
+
+    def call():
+        barrier.wait()
+        try:
+            return fn()
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=n) as ex:
+        return list(ex.map(lambda _: call(), range(n)))
+
+
+def test_breeam_get_one_upstream_call(stub):
+    path = _unique_path()
+    results = _run_together(lambda: breeam_api.breeam_get(path, {"page": 1}))
+    assert stub.hits["/datav1" + path] == 1
+    assert all(r == results[0] for r in results)
+    assert results[0]["path"] == "/datav1" + path
+
+
+def test_single_flight_shares_http_call(stub):
+    path = _unique_path()
+    group = SingleFlight()
+    results = _run_together(lambda: group.do(path, lambda: breeam_api._breeam_get_http(path)))
+    assert stub.hits["/datav1" + path] == 1
+    assert sorted(shared for _, shared in results) == [False] + [True] * (CALLERS - 1)
+    assert all(value == results[0][0] for value, _ in results)
+    assert group.in_flight() == 0
+
+
+def test_error_reaches_every_waiter_and_next_call_retries(stub):
+    path = _unique_path()
+    stub.failing.add("/datav1" + path)
+    results = _run_together(lambda: breeam_api.breeam_get(path))
+    assert stub.hits["/datav1" + path] == 1
+    assert all(isinstance(r, Exception) for r in results)
+    assert len({id(r) for r in results}) == 1
+
+    # błąd nie zostaje w cache – następne wywołanie pyta API ponownie
+    stub.failing.discard("/datav1" + path)
+    assert breeam_api.breeam_get(path)["n"] == 2
+    assert stub.hits["/datav1" + path] == 2
@@ -0,0 +1 @@
+# utils – wspólne helpery dla stron aplikacji (BREEAM API, BREEAM Excel, LEED)
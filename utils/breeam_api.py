@@ -0,0 +1,285 @@
+# utils/breeam_api.py
+# Warstwa BREEAM API bez UI – wspólna dla strony "BREEAM aktualne" i rozgrzewania cache przy starcie.
+import os
+import time
+
+import pandas as pd
+import streamlit as st
+from requests.auth import HTTPBasicAuth
+
+from utils import telemetry
+from utils.breeam_store import get_assessment_store, scope_key
+from utils.dates import parse_dates
+from utils.expiry import add_expiry_columns
+from utils.frames import compact_frame, rename_columns
+from utils.http import default_timeout, get_session
+from utils.http_cache import cached_get
+from utils.json_stream import IJSON_AVAILABLE, iter_frames, iter_json_items
+from utils.singleflight import get_single_flight
+from utils.swr import swr_cache
+
+# ================== KONFIGURACJA BREEAM (credentials.py / ENV / st.secrets) ==================
+BASE_DEFAULT = "https://api.breeam.com/datav1"
+
+def get_secret(key: str, default: str = "") -> str:
+    # streamlit cloud -> st.secrets
+    try:
+        if key in st.secrets:
+            return str(st.secrets.get(key))
+    except Exception:
+        pass
+    # lokalnie -> ENV
+    return os.getenv(key, default)
+
+# Najpierw próbuj credentials.py (lokalnie), potem secrets/env
+try:
+    from credentials import BREEAM_USER as _CU, BREEAM_PASS as _CP
+    BREEAM_USER, BREEAM_PASS = _CU, _CP
+except Exception:
+    BREEAM_USER = get_secret("BREEAM_USER", "")
+    BREEAM_PASS = get_secret("BREEAM_PASS", "")
+
+BREEAM_BASE = get_secret("BREEAM_API_BASE", BASE_DEFAULT)
+
+def credentials_ok() -> bool:
+    return bool(BREEAM_USER and BREEAM_PASS)
+
+def _listify(x):
+    if x is None:
+        return []
+    if isinstance(x, list):
+        return x
+    if isinstance(x, dict):
+        return [x]
+    return []
+
+auth = HTTPBasicAuth(BREEAM_USER, BREEAM_PASS)
+HDRS = {"Accept": "application/json"}
+
+def _flight_key(path: str, params=None) -> tuple:
+    return (path.lstrip("/"), tuple(sorted((params or {}).items())))
+
+# po 30 min oddaje ostatnią odpowiedź od razu i odświeża ją w tle (błąd odświeżenia = zostają stare dane)
+@swr_cache(ttl=60 * 30)
+def breeam_get(path: str, params=None):
+    # równoległe identyczne zapytania (np. kilka sesji po wygaśnięciu cache) czekają na jedno wywołanie API
+    data, shared = get_single_flight().do(_flight_key(path, params), lambda: _breeam_get_http(path, params))
+    if shared:
+        telemetry.record("/" + path.lstrip("/"), "shared")
+    return data
+
+def _breeam_get_http(path: str, params=None):
+    p = path.lstrip("/")
+    url = f"{BREEAM_BASE.rstrip('/')}/{p}"
+    # wspólna Session (keep-alive, ponowienia) + trwały cache na dysku: ETag/Last-Modified -> 304 bez treści
+    t0 = time.perf_counter()
+    try:
+        r = cached_get(url, auth=auth, headers=HDRS, params=params, timeout=default_timeout())
+    except Exception as e:
+        telemetry.record("/" + p, "miss", time.perf_counter() - t0, error=str(e))
+        raise
+    telemetry.record(
+        "/" + p, r.from_cache or "miss", time.perf_counter() - t0, len(r.content),
+        telemetry.response_retries(r), "" if r.ok else f"HTTP {r.status_code}",
+    )
+    if r.status_code == 401:
+        raise RuntimeError("401 Unauthorized – sprawdź login/hasło/uprawnienia.")
+    r.raise_for_status()
+    try:
+        return r.json()
+    except Exception:
+        return {"_raw_text": r.text}
+
+# bez własnego cache – parsowanie jest tanie, a świeżość trzyma breeam_get
+def breeam_countries():
+    data = breeam_get("/countries")
+    countries = data.get("results", {}).get("countries", {}).get("country", None)
+    if countries is None:
+        countries = data.get("countries") or data.get("country") or []
+    return list(sorted([c for c in _listify(countries) if isinstance(c, str)]))
+
+def breeam_schemes_df():
+    data = breeam_get("/schemes")
+    base = data.get("results", {}).get("schemes", {}).get("scheme", None)
+    if base is None:
+        base = data.get("results", {}).get("scheme", None)
+    if base is None:
+        base = data.get("schemes", None)
+    if base is None:
+        base = data.get("scheme", None)
+
+    schemes = _listify(base)
+    items = []
+    for s in schemes:
+        if not isinstance(s, dict):
+            continue
+        sid = s.get("schemeID") or s.get("id") or s.get("schemeId")
+        sname = s.get("schemeName") or s.get("name") or s.get("scheme")
+        if sid is not None and sname is not None:
+            items.append({"schemeID": sid, "schemeName": str(sname)})
+
+        subs = s.get("subSchemes", {}).get("scheme", None)
+        for ss in _listify(subs):
+            if not isinstance(ss, dict):
+                continue
+            ssid = ss.get("schemeID") or ss.get("id") or ss.get("schemeId")
+            ssname = ss.get("schemeName") or ss.get("name") or ss.get("scheme")
+            if ssid is not None and ssname is not None:
+                items.append({"schemeID": ssid, "schemeName": f"{sname} / {ssname}".strip(" /")})
+
+    df = pd.DataFrame(items)
+    if not df.empty:
+        df["schemeName"] = df["schemeName"].astype(str)
+        df = df.drop_duplicates()
+
+    return df, data
+
+BREEAM_API_RENAME = {
+    "buildingName": "asset_name",
+    "name": "asset_name",
+    "certNo": "certificate_number",
+    "country": "country",
+    "city": "city",
+    "county": "region",
+    "regAddresLine1": "regAddresLine1",
+    "regAddressLine1": "regAddresLine1",
+    "addressLine1": "addressLine1",
+    "projectType": "projectType",
+    "scheme": "scheme",
+    "standard": "standard",
+    "stage": "stage",
+    "assessor": "assessor",
+    "assessorAuditor": "assessor",
+    "assessorName": "assessor",
+    "auditor": "assessor",
+    "publicUrl": "publicUrl",
+    "latitude": "latitude",
+    "longitude": "longitude",
+    "lat": "latitude",
+    "lon": "longitude",
+    "lng": "longitude",
+}
+
+# kolumny o małej liczbie wartości – zawsze jako category
+BREEAM_CATEGORICAL = ("country", "projectType", "scheme", "standard", "source_country", "source_scheme")
+
+def normalize_breeam_from_api(df: pd.DataFrame) -> pd.DataFrame:
+    # zmiana nazw bez kopiowania kolumn (wcześniej źródło zostawało obok kopii)
+    return rename_columns(df, BREEAM_API_RENAME)
+
+def compute_breeam_expiries(df: pd.DataFrame) -> pd.DataFrame:
+    expiry = parse_dates(df["stage"], dayfirst=True) if "stage" in df.columns else None
+    return add_expiry_columns(df, expiry)
+
+# ścieżki rekordów w odpowiedzi /assessments (lista albo pojedynczy obiekt)
+ASSESSMENT_PREFIXES = (
+    "results.assessments.assessment.item",
+    "results.assessments.assessment",
+    "assessments.item",
+    "assessments",
+    "assessment.item",
+    "assessment",
+)
+
+def _extract_assessments(data: dict) -> list:
+    raw = data.get("results", {}).get("assessments", {}).get("assessment", None)
+    if raw is None:
+        raw = data.get("assessments") or data.get("assessment") or []
+    return _listify(raw)
+
+def breeam_stream(path: str, params=None):
+    """
+    Strumieniowe /assessments: odpowiedź czytana kawałkami (ijson), rekordy oddawane
+    jako DataFrame'y po STREAM_CHUNK_ROWS – bez trzymania całego tekstu i drzewa JSON.
+    """
+    p = path.lstrip("/")
+    url = f"{BREEAM_BASE.rstrip('/')}/{p}"
+    t0 = time.perf_counter()
+    try:
+        r = get_session().get(url, auth=auth, headers=HDRS, params=params, timeout=default_timeout(), stream=True)
+    except Exception as e:
+        telemetry.record("/" + p, "miss", time.perf_counter() - t0, error=str(e))
+        raise
+    error = ""
+    try:
+        with r:
+            if r.status_code == 401:
+                raise RuntimeError("401 Unauthorized – sprawdź login/hasło/uprawnienia.")
+            r.raise_for_status()
+            if IJSON_AVAILABLE:
+                r.raw.decode_content = True
+                items = iter_json_items(r.raw, ASSESSMENT_PREFIXES)
+            else:
+                items = iter(_extract_assessments(r.json()))
+            yield from iter_frames(items)
+    except Exception as e:
+        error = str(e)
+        raise
+    finally:
+        # czas do końca strumienia (albo do przerwania podglądu), bajty odebrane z sieci
+        telemetry.record(
+            "/" + p, "miss", time.perf_counter() - t0, r.raw.tell() if r.raw is not None else None,
+            telemetry.response_retries(r), error,
+        )
+
+def fetch_assessments(country: str | None, scheme_id: int | None, on_chunk=None) -> pd.DataFrame:
+    # kluczowa zmiana: jeśli scheme_id jest None -> pobieramy /assessments (bez scheme)
+    path = f"/assessments/{scheme_id}" if scheme_id else "/assessments"
+    params = {}
+    if country:
+        params["country"] = country
+
+    def fetch():
+        parts = []
+        for chunk in breeam_stream(path, params):
+            parts.append(chunk)
+            if on_chunk is not None:
+                on_chunk(chunk)
+        return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+    # ten sam zestaw pobierany już przez inną sesję -> czekamy na jej wynik zamiast drugiego zapytania
+    df, shared = get_single_flight().do(_flight_key(path, params), fetch)
+    if shared:
+        telemetry.record(path, "shared")
+        if on_chunk is not None and not df.empty:
+            on_chunk(df)
+    return df
+
+def breeam_preview(path: str, params=None, n: int = 3) -> list[dict]:
+    """Pierwsze n rekordów bez pobierania całej odpowiedzi (połączenie zamykane wcześniej)."""
+    out = []
+    for chunk in breeam_stream(path, params):
+        out.extend(chunk.head(n - len(out)).to_dict("records"))
+        if len(out) >= n:
+            break
+    return out
+
+def _process_assessments(df: pd.DataFrame) -> pd.DataFrame:
+    return compute_breeam_expiries(normalize_breeam_from_api(df))
+
+def sync_breeam(parts) -> dict:
+    """Przyrostowa synchronizacja pobranych zakresów z lokalną kopią (tylko nowe/zmienione rekordy są przetwarzane)."""
+    store = get_assessment_store()
+    total = {"added": 0, "changed": 0, "removed": 0}
+    for (c, sid, _), part in parts:
+        stats = store.sync(scope_key(c, sid), part, _process_assessments)
+        for k in total:
+            total[k] += stats[k]
+    return total
+
+def load_breeam_local(tasks) -> pd.DataFrame:
+    """Lokalna kopia dla wybranych zakresów: months_to_expiry/status liczone na dziś, daty już sparsowane."""
+    labels = {scope_key(c, sid): (c or "(dowolne)", sname) for c, sid, sname in tasks}
+    df = get_assessment_store().load(list(labels))
+    if df.empty:
+        return df
+    df["source_country"] = df["_scope"].map(lambda s: labels[s][0])
+    df["source_scheme"] = df["_scope"].map(lambda s: labels[s][1])
+    # rekordy zapisane starszą wersją mogą mieć jeszcze kolumny źródłowe obok docelowych
+    df = rename_columns(df.drop(columns="_scope"), BREEAM_API_RENAME)
+    df = add_expiry_columns(df, df["expiry_date"] if "expiry_date" in df.columns else None)
+    if "certificate_number" in df.columns:
+        # ten sam certyfikat z kilku zapytań (np. scheme + sub-scheme) – zostaje pierwszy
+        dup = df["certificate_number"].notna() & df.duplicated(subset="certificate_number")
+        df = df[~dup].reset_index(drop=True)
+    return compact_frame(df, categorical=BREEAM_CATEGORICAL)
@@ -0,0 +1,192 @@
+# utils/breeam_store.py
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Callable
+
+import pandas as pd
+
+# Lokalna, trwała kopia assessments z BREEAM API (klucz: scope + certNo)
+BREEAM_STORE_PATH = os.getenv("BREEAM_STORE_PATH", os.path.join(".cache", "breeam_assessments.sqlite"))
+
+
+def scope_key(country: str | None, scheme_id: int | None) -> str:
+    """Zakres jednego zapytania API: państwo × scheme."""
+    return f"{country or '*'}|{scheme_id if scheme_id is not None else '*'}"
+
+
+def record_hash(record: dict) -> str:
+    clean = {k: v for k, v in record.items() if not _is_missing(v)}
+    return hashlib.sha1(json.dumps(clean, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _is_missing(v) -> bool:
+    try:
+        return bool(pd.isna(v))
+    except (TypeError, ValueError):
+        # listy / dict-y z API
+        return False
+
+
+class AssessmentStore:
+    """
+    Tabela assessments: (scope, cert_no) -> hash treści surowego rekordu + rekord przetworzony
+    (po normalizacji i wyliczeniu expiry_date). Synchronizacja przepuszcza przez `process`
+    tylko nowe i zmienione rekordy; rekordy, których API już nie zwraca, dostają removed_at.
+    """
+
+    def __init__(self, path: str = BREEAM_STORE_PATH):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with self._connect() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS assessments (
+                    scope        TEXT NOT NULL,
+                    cert_no      TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    record       TEXT NOT NULL,
+                    first_seen   REAL NOT NULL,
+                    updated_at   REAL NOT NULL,
+                    removed_at   REAL,
+                    PRIMARY KEY (scope, cert_no)
+                )
+                """
+            )
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sync_log (
+                    scope     TEXT PRIMARY KEY,
+                    synced_at REAL NOT NULL,
+                    added     INTEGER NOT NULL,
+                    changed   INTEGER NOT NULL,
+                    removed   INTEGER NOT NULL,
+                    total     INTEGER NOT NULL
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=30)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def sync(self, scope: str, raw: pd.DataFrame, process: Callable[[pd.DataFrame], pd.DataFrame],
+             key: str = "certNo") -> dict:
+        """Upsert nowych/zmienionych rekordów zakresu, oznaczenie zniknięć. Zwraca liczniki."""
+        now = time.time()
+        raw = raw.reset_index(drop=True)
+        records = raw.to_dict("records")
+        hashes = [record_hash(r) for r in records]
+        keys = [
+            str(r.get(key)) if not _is_missing(r.get(key)) else f"#{h}"
+            for r, h in zip(records, hashes)
+        ]
+
+        with self._connect() as con:
+            known = dict(
+                con.execute(
+                    "SELECT cert_no, content_hash || CASE WHEN removed_at IS NULL THEN '' ELSE '!' END "
+                    "FROM assessments WHERE scope = ?",
+                    (scope,),
+                ).fetchall()
+            )
+
+        # ten sam certNo kilka razy w odpowiedzi – zostaje ostatnie wystąpienie (jak przy upsercie),
+        # liczniki liczone na unikalnych kluczach
+        last = {k: i for i, k in enumerate(keys)}
+        # rekord zmieniony = inny hash albo wcześniej oznaczony jako usunięty
+        todo = [i for k, i in last.items() if known.get(k) != hashes[i]]
+        seen = set(last)
+        gone = [k for k, h in known.items() if k not in seen and not h.endswith("!")]
+
+        rows = []
+        if todo:
+            processed = process(raw.iloc[todo]).reset_index(drop=True)
+            for j, rec in enumerate(processed.to_dict("records")):
+                i = todo[j]
+                rows.append((scope, keys[i], hashes[i], json.dumps(rec, default=str), now, now))
+
+        added = sum(1 for i in todo if keys[i] not in known)
+        with self._connect() as con:
+            con.executemany(
+                """
+                INSERT INTO assessments (scope, cert_no, content_hash, record, first_seen, updated_at, removed_at)
+                VALUES (?, ?, ?, ?, ?, ?, NULL)
+                ON CONFLICT(scope, cert_no) DO UPDATE SET
+                    content_hash = excluded.content_hash, record = excluded.record,
+                    updated_at = excluded.updated_at, removed_at = NULL
+                """,
+                rows,
+            )
+            con.executemany(
+                "UPDATE assessments SET removed_at = ? WHERE scope = ? AND cert_no = ?",
+                [(now, scope, k) for k in gone],
+            )
+            stats = {"added": added, "changed": len(todo) - added, "removed": len(gone), "total": len(last)}
+            con.execute(
+                "INSERT OR REPLACE INTO sync_log (scope, synced_at, added, changed, removed, total) VALUES (?, ?, ?, ?, ?, ?)",
+                (scope, now, stats["added"], stats["changed"], stats["removed"], stats["total"]),
+            )
+        return stats
+
+    def load(self, scopes: list[str], include_removed: bool = False) -> pd.DataFrame:
+        """Rekordy przetworzone dla zakresów (kolumna _scope); pusta ramka, gdy brak kopii."""
+        if not scopes:
+            return pd.DataFrame()
+        marks = ",".join("?" for _ in scopes)
+        sql = f"SELECT scope, record, removed_at FROM assessments WHERE scope IN ({marks})"
+        if not include_removed:
+            sql += " AND removed_at IS NULL"
+        with self._connect() as con:
+            rows = con.execute(sql + " ORDER BY rowid", list(scopes)).fetchall()
+        if not rows:
+            return pd.DataFrame()
+        df = pd.DataFrame([json.loads(r[1]) for r in rows])
+        df["_scope"] = [r[0] for r in rows]
+        if include_removed:
+            df["removed_at"] = pd.to_datetime([r[2] for r in rows], unit="s")
+        return df
+
+    def scopes(self) -> list[str]:
+        """Zakresy z aktualnymi (nieusuniętymi) rekordami, w kolejności pierwszej synchronizacji."""
+        with self._connect() as con:
+            rows = con.execute(
+                "SELECT scope FROM assessments WHERE removed_at IS NULL GROUP BY scope ORDER BY MIN(rowid)"
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def version(self) -> tuple:
+        """Zmienia się przy każdej synchronizacji, która coś dodała, zmieniła albo usunęła (tanie zapytanie)."""
+        with self._connect() as con:
+            return tuple(con.execute("SELECT COUNT(*), MAX(updated_at), MAX(removed_at) FROM assessments").fetchone())
+
+    def last_sync(self, scopes: list[str]) -> dict[str, float]:
+        if not scopes:
+            return {}
+        marks = ",".join("?" for _ in scopes)
+        with self._connect() as con:
+            return dict(con.execute(f"SELECT scope, synced_at FROM sync_log WHERE scope IN ({marks})", list(scopes)).fetchall())
+
+
+_store_lock = threading.Lock()
+_store: AssessmentStore | None = None
+
+
+def get_assessment_store() -> AssessmentStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = AssessmentStore()
+        return _store
@@ -0,0 +1,106 @@
+# utils/datasets.py
+import os
+import threading
+from datetime import date
+from typing import Callable
+
+import pandas as pd
+
+from utils.dates import parse_dates
+from utils.excel_cache import excel_columns, read_excel_cached
+from utils.expiry import add_expiry_columns
+from utils.frames import compact_frame, rename_columns
+from utils.shared_cache import code_fingerprint, get_cache_backend, shared_cache
+from utils.sources import BREEAM_EXCEL_RENAME
+
+# gotowa ramka we wspólnym backendzie – inne procesy/repliki nie budują jej od nowa
+DATASET_SHARED_TTL = 60 * 60 * 24 * 2
+
+
+class DatasetStore:
+    """
+    Procesowy magazyn przetworzonych ramek (wspólny dla wszystkich sesji).
+    Pipeline load -> normalizacja -> expiry liczony jest raz na (mtime pliku, dzień);
+    dzień wchodzi do klucza, bo months_to_expiry zależy od date.today().
+
+    Dwa poziomy: słownik w procesie + wspólny backend (utils.shared_cache) dla innych procesów.
+
+    Zwracana ramka jest współdzielona – traktuj ją jako tylko do odczytu
+    (filtruj / rób .copy() przed modyfikacją).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._build_locks: dict[str, threading.Lock] = {}
+        self._entries: dict[str, tuple[tuple, pd.DataFrame]] = {}
+
+    def _version(self, path: str) -> tuple:
+        return os.stat(path).st_mtime_ns, date.today().isoformat()
+
+    def get(self, name: str, path: str, build: Callable[[str], pd.DataFrame]) -> pd.DataFrame:
+        version = self._version(path)
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        with self._lock:
+            build_lock = self._build_locks.setdefault(name, threading.Lock())
+        # jedna budowa na raz per dataset; pozostałe sesje czekają na jej wynik
+        with build_lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+            shared_key = f"dataset:{name}:{code_fingerprint(build)}:{version[0]}:{version[1]}"
+            hit = get_cache_backend().get(shared_key)
+            if hit is not None:
+                df = hit[0]
+            else:
+                df = build(path)
+                get_cache_backend().set(shared_key, df, DATASET_SHARED_TTL)
+            self._entries[name] = (version, df)
+            return df
+
+    def invalidate(self, name: str | None = None):
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+        get_cache_backend().delete("dataset:" + (f"{name}:" if name else ""))
+
+
+DATASETS = DatasetStore()
+
+
+# ================== RAMKI STRON (wspólne dla stron i utils.prewarm) ==================
+def normalize_breeam_from_excel(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    # pierwsze istniejące źródło wygrywa (np. "Audytor/Assesor" przed "Assessor") – bez zdublowanych nazw kolumn
+    df = rename_columns(df, BREEAM_EXCEL_RENAME)
+    if "system" not in df.columns:
+        df["system"] = "BREEAM"
+    return df
+
+
+def load_breeam_excel(path: str) -> pd.DataFrame:
+    """BREEAM.xlsx (strona wygasłych) – budowane przez DATASETS.get("breeam_excel", path, load_breeam_excel)."""
+    df = normalize_breeam_from_excel(read_excel_cached(path, engine="openpyxl"))
+    # expiry zawsze od 'stage'
+    expiry = parse_dates(df["stage"], dayfirst=True) if "stage" in df.columns else None
+    df = add_expiry_columns(df, expiry)
+    # ramka trzymana dla wszystkich sesji – kompaktowe typy (category / string[pyarrow])
+    return compact_frame(df, categorical=("country", "projectType", "system", "scheme", "standard", "region"))
+
+
+# wspólny cache procesów/replik (utils.shared_cache), wpis wygasa po dobie
+@shared_cache(ttl=60 * 60 * 24, name="leed_columns")
+def leed_columns(path: str, mtime: float) -> list[str]:
+    return excel_columns(path, engine="openpyxl")
+
+
+@shared_cache(ttl=60 * 60 * 24, name="load_leed_df")
+def load_leed_df(path: str, mtime: float, columns: tuple) -> pd.DataFrame:
+    # mtime tylko jako klucz cache – po podmianie pliku dane wczytają się ponownie;
+    # z Parquet czytane są tylko wskazane kolumny, tekst jako category / string[pyarrow]
+    df = read_excel_cached(path, columns=list(columns), engine="openpyxl")
+    return compact_frame(df, categorical=("Country", "State", "LEEDSystemVersion", "CertLevel"))
@@ -0,0 +1,95 @@
+# utils/dates.py
+import re
+import pandas as pd
+from dateutil import parser as dtparser
+
+DATE_RX = re.compile(
+    r"(\d{4}[-/\.]\d{1,2}[-/\.]\d{1,2})|"
+    r"(\d{1,2}[-/\.]\d{1,2}[-/\.]\d{2,4})|"
+    r"(\d{4}[-/\.]\d{1,2})"
+)
+
+# Pełne dopasowania dla szybkiej ścieżki (opcjonalnie z północą, jak str(datetime) z Excela)
+_YMD_FULL = r"\d{4}[-/\.]\d{1,2}[-/\.]\d{1,2}(?:\s+00:00:00)?"
+_DMY_FULL = r"\d{1,2}[-/\.]\d{1,2}[-/\.]\d{4}(?:\s+00:00:00)?"
+
+# Kolejność formatów odtwarza rozstrzyganie dzień/miesiąc w dateutil,
+# więc wynik jest identyczny jak z parse_date_any dla tego samego dayfirst.
+STRICT_FORMATS = {
+    True: [
+        (_YMD_FULL, "%Y/%d/%m"),
+        (_YMD_FULL, "%Y/%m/%d"),
+        (_DMY_FULL, "%d/%m/%Y"),
+        (_DMY_FULL, "%m/%d/%Y"),
+    ],
+    False: [
+        (_YMD_FULL, "%Y/%m/%d"),
+        (_DMY_FULL, "%m/%d/%Y"),
+        (_DMY_FULL, "%d/%m/%Y"),
+    ],
+}
+
+
+def parse_date_any(x, dayfirst: bool = True):
+    if x is None or (isinstance(x, float) and pd.isna(x)):
+        return None
+    s = str(x).strip()
+    if not s:
+        return None
+    try:
+        return dtparser.parse(s, dayfirst=dayfirst, fuzzy=True).date()
+    except Exception:
+        pass
+    m = DATE_RX.search(s)
+    if m:
+        try:
+            return dtparser.parse(m.group(0), dayfirst=dayfirst).date()
+        except Exception:
+            return None
+    return None
+
+
+def parse_dates(values, dayfirst: bool = True) -> pd.Series:
+    """
+    Wsadowy odpowiednik parse_date_any dla całej kolumny.
+    Zwraca Series datetime64 (NaT zamiast None) z tym samym indeksem co wejście.
+
+    1) deduplikacja wartości (factorize),
+    2) ścisłe przebiegi pd.to_datetime(format=...) po unikalnych tekstach,
+    3) tylko resztki idą do rozmytego dateutil (parse_date_any).
+    """
+    s = values if isinstance(values, pd.Series) else pd.Series(values)
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+
+    texts = pd.Series([str(u).strip() for u in uniques], dtype=object)
+    norm = (
+        texts.str.replace(r"\s+00:00:00$", "", regex=True)
+        .str.replace(r"[-\.]", "/", regex=True)
+    )
+
+    pieces = []
+    done = pd.Series(False, index=texts.index)
+    for pattern, fmt in STRICT_FORMATS[dayfirst]:
+        todo = ~done & texts.str.fullmatch(pattern)
+        if not todo.any():
+            continue
+        res = pd.to_datetime(norm[todo], format=fmt, errors="coerce").dropna()
+        if not res.empty:
+            pieces.append(res)
+            done[res.index] = True
+
+    rest = ~done & texts.ne("")
+    if rest.any():
+        fuzzy = pd.to_datetime(
+            texts[rest].map(lambda x: parse_date_any(x, dayfirst=dayfirst)), errors="coerce"
+        ).dropna()
+        if not fuzzy.empty:
+            pieces.append(fuzzy)
+
+    if pieces:
+        parsed = pd.concat(pieces).reindex(texts.index)
+    else:
+        parsed = pd.Series(pd.NaT, index=texts.index, dtype="datetime64[ns]")
+
+    out = pd.Series(codes, index=s.index).map(parsed)
+    return pd.to_datetime(out, errors="coerce")
@@ -0,0 +1,138 @@
+# utils/excel_cache.py
+import os
+import json
+import hashlib
+import tempfile
+import pandas as pd
+
+# Sidecar cache: <katalog pliku>/.cache/<nazwa>.parquet + <nazwa>.meta.json
+CACHE_DIR_NAME = ".cache"
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _cache_paths(path: str, read_kwargs: dict) -> tuple[str, str]:
+    folder, name = os.path.split(os.path.abspath(path))
+    stem = name
+    if read_kwargs:
+        variant = json.dumps(read_kwargs, sort_keys=True, default=str)
+        stem = f"{name}.{hashlib.sha1(variant.encode('utf-8')).hexdigest()[:10]}"
+    cache_dir = os.path.join(folder, CACHE_DIR_NAME)
+    return os.path.join(cache_dir, f"{stem}.parquet"), os.path.join(cache_dir, f"{stem}.meta.json")
+
+
+def _read_meta(meta_path: str) -> dict:
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _dump_meta(meta: dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def _write_atomic(path: str, write_fn):
+    # plik tymczasowy unikalny per wywołanie (nie tylko per proces) – sesje Streamlit to wątki jednego procesu
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        write_fn(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def normalize_for_parquet(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Excel potrafi zwrócić kolumny object z mieszanymi typami (np. tekst + datetime),
+    których Arrow nie zapisze – takie kolumny zamieniamy na tekst (braki zostają brakami).
+    """
+    df = df.copy()
+    df.columns = [str(c) for c in df.columns]
+    for c in df.columns:
+        s = df[c]
+        if s.dtype != object:
+            continue
+        types = set(s.dropna().map(type).unique())
+        if len(types) > 1:
+            df[c] = s.map(lambda x: x if pd.isna(x) else str(x))
+    return df
+
+
+def _read_parquet(parquet_path: str, columns=None) -> pd.DataFrame:
+    if columns is None:
+        return pd.read_parquet(parquet_path)
+    import pyarrow.parquet as pq
+
+    # projekcja kolumn: Parquet czyta tylko wybrane kolumny, nieistniejące są pomijane
+    wanted = set(columns)
+    return pd.read_parquet(parquet_path, columns=[c for c in pq.read_schema(parquet_path).names if c in wanted])
+
+
+def read_excel_cached(path: str, columns=None, **read_kwargs) -> pd.DataFrame:
+    """
+    pd.read_excel z przezroczystym cache w Parquet.
+    Cache jest ważny, gdy zgadza się rozmiar + mtime pliku, albo (po zmianie mtime)
+    zgadza się hash treści. W przeciwnym razie Excel jest czytany i cache budowany od nowa.
+    `columns` – tylko te kolumny (kolejność jak w pliku); cache zawsze trzyma cały arkusz,
+    więc inna projekcja nie wymaga ponownego czytania Excela.
+    """
+    read_kwargs.setdefault("engine", "openpyxl")
+    parquet_path, meta_path = _cache_paths(path, read_kwargs)
+
+    st_src = os.stat(path)
+    meta = _read_meta(meta_path)
+    if meta and os.path.exists(parquet_path) and meta.get("size") == st_src.st_size:
+        try:
+            if meta.get("mtime_ns") == st_src.st_mtime_ns:
+                return _read_parquet(parquet_path, columns)
+            digest = file_sha256(path)
+            if meta.get("sha256") == digest:
+                # ta sama treść, inny mtime (np. skopiowany plik) – odśwież tylko metadane
+                meta["mtime_ns"] = st_src.st_mtime_ns
+                _write_atomic(meta_path, lambda p: _dump_meta(meta, p))
+                return _read_parquet(parquet_path, columns)
+        except Exception:
+            pass
+
+    df = normalize_for_parquet(pd.read_excel(path, **read_kwargs))
+    try:
+        os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
+        _write_atomic(parquet_path, lambda p: df.to_parquet(p, index=False))
+        meta = {
+            "source": os.path.basename(path),
+            "size": st_src.st_size,
+            "mtime_ns": st_src.st_mtime_ns,
+            "sha256": file_sha256(path),
+        }
+        _write_atomic(meta_path, lambda p: _dump_meta(meta, p))
+    except Exception:
+        # brak pyarrow / brak praw zapisu – działamy bez cache
+        pass
+    if columns is not None:
+        wanted = set(columns)
+        df = df[[c for c in df.columns if c in wanted]]
+    return df
+
+
+def excel_columns(path: str, **read_kwargs) -> list[str]:
+    """Nazwy kolumn arkusza – ze schematu Parquet (bez czytania danych), gdy cache istnieje."""
+    read_kwargs.setdefault("engine", "openpyxl")
+    parquet_path, _ = _cache_paths(path, read_kwargs)
+    read_excel_cached(path, columns=[], **read_kwargs)  # zbuduje/odświeży cache, jeśli trzeba
+    try:
+        import pyarrow.parquet as pq
+
+        return list(pq.read_schema(parquet_path).names)
+    except Exception:
+        return [str(c) for c in read_excel_cached(path, **read_kwargs).columns]
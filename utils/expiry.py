@@ -0,0 +1,70 @@
+# utils/expiry.py
+import numpy as np
+import pandas as pd
+from datetime import date
+
+NO_DATE_LABEL = "❓ Brak daty"
+EXPIRY_LABELS = ["⛔ Wygasły", "🔴 ≤ 6 mies.", "🟠 6–12 mies.", "🟡 12–18 mies.", "✅ > 18 mies."]
+# przedziały prawostronnie domknięte na liczbach całkowitych: <0, 0–6, 7–12, 13–18, >18
+EXPIRY_BINS = [-np.inf, -1, 6, 12, 18, np.inf]
+# kolor tła wiersza tabeli dla każdego przedziału (kolejność jak EXPIRY_LABELS)
+EXPIRY_COLORS = ["#ffcccc", "#ffe0cc", "#fff2cc", "#fff7cc", "#e6ffea"]
+
+
+def months_left_signed(dates, today: date | None = None) -> pd.Series:
+    """
+    Wektorowo: >0 – ważny, 0 – wygasa w bieżącym miesiącu, <0 – wygasły.
+    Przyjmuje Series dat (datetime64 albo obiekty date), zwraca Int64 (<NA> dla braku daty).
+    """
+    s = dates if isinstance(dates, pd.Series) else pd.Series(dates)
+    d = pd.to_datetime(s, errors="coerce").to_numpy().astype("datetime64[D]")
+    t = np.datetime64(today or date.today(), "D")
+
+    d_month = d.astype("datetime64[M]")
+    t_month = t.astype("datetime64[M]")
+    d_day = (d - d_month.astype("datetime64[D]")).astype("int64") + 1
+    t_day = int((t - t_month.astype("datetime64[D]")).astype("int64")) + 1
+
+    m = (d_month - t_month).astype("int64")
+    m += (d >= t) & (d_day > t_day)
+    m -= (d < t) & (d_day < t_day)
+
+    out = pd.array(m, dtype="Int64")
+    out[np.isnat(d)] = pd.NA
+    return pd.Series(out, index=s.index, name="months_to_expiry")
+
+
+def expiry_status(months) -> pd.Series:
+    """Etykieta ważności jako kategoria (binning jak pd.cut), brak daty -> NO_DATE_LABEL."""
+    m = pd.to_numeric(months, errors="coerce").astype("float64")
+    status = pd.cut(m, bins=EXPIRY_BINS, labels=EXPIRY_LABELS, right=True)
+    status = status.cat.add_categories([NO_DATE_LABEL]).fillna(NO_DATE_LABEL)
+    return status.rename("expiry_status")
+
+
+def add_expiry_columns(df: pd.DataFrame, expiry: pd.Series | None) -> pd.DataFrame:
+    """
+    Dopisuje expiry_date, months_to_expiry i expiry_status w jednym przebiegu.
+    `expiry` – Series dat wygaśnięcia wyrównana do df.index (albo None, gdy brak źródła dat).
+    """
+    df = df.copy()
+    if expiry is None:
+        expiry = pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+    expiry = pd.to_datetime(expiry, errors="coerce")
+    df["expiry_date"] = expiry.dt.date
+    df["months_to_expiry"] = months_left_signed(expiry)
+    df["expiry_status"] = expiry_status(df["months_to_expiry"])
+    return df
+
+
+def add_years(dates, years) -> pd.Series:
+    """
+    Wektorowy odpowiednik `d + relativedelta(years=n)` (29.02 -> 28.02 w roku nieprzestępnym).
+    `years` – Series liczby lat wyrównana do `dates`; przesunięcie liczone raz na każdą wartość.
+    """
+    dates = pd.to_datetime(dates, errors="coerce")
+    out = pd.Series(pd.NaT, index=dates.index, dtype=dates.dtype)
+    for n in pd.unique(years):
+        mask = (years == n).to_numpy()
+        out[mask] = dates[mask] + pd.DateOffset(years=int(n))
+    return out
@@ -0,0 +1,139 @@
+# utils/filters.py
+# Filtry jako bitmapy wierszy nad wspólną ramką bazową: każdy etap to AND bitmap,
+# ramka nie jest kopiowana po drodze – kopię robi dopiero frame() z końcowego, widocznego wycinka.
+# BitmapIndex (wartość/zakres -> bitmapa) budowany raz na wersję danych, więc kombinacja filtrów
+# i listy opcji w dropdownach nie wymagają ponownego skanowania kolumn.
+import numpy as np
+import pandas as pd
+
+# zakresy "Zakres widocznych certyfikacji" (miesiące do wygaśnięcia) – granice jak dotąd, NaN poza każdym zakresem
+VIEW_PREDICATES = {
+    "Tylko wygasłe": lambda m: m < 0,
+    "≤ 6 mies.": lambda m: m.between(0, 6, inclusive="both"),
+    "6–12 mies.": lambda m: m.between(7, 12, inclusive="both"),
+    "12–18 mies.": lambda m: m.between(12, 18, inclusive="both"),
+    "> 18 mies.": lambda m: m > 18,
+}
+
+# liczba ustawionych bitów dla każdego bajtu
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def as_mask(predicate, n: int) -> np.ndarray:
+    """Series/ndarray/lista -> tablica bool długości n (braki = False, dopasowanie pozycyjne)."""
+    if isinstance(predicate, pd.Series):
+        out = predicate.to_numpy(dtype=bool, na_value=False)
+    else:
+        out = np.asarray(predicate, dtype=bool)
+    if out.shape != (n,):
+        raise ValueError(f"Maska ma długość {out.shape}, a ramka {n} wierszy")
+    return out
+
+
+def to_bitmap(predicate, n: int) -> np.ndarray:
+    """Predykat -> bitmapa (np.packbits, bit na wiersz; bity dopełnienia zawsze 0)."""
+    return np.packbits(as_mask(predicate, n))
+
+
+def popcount(bits: np.ndarray) -> int:
+    return int(_POPCOUNT[bits].sum(dtype=np.int64))
+
+
+def expiry_buckets(months: pd.Series) -> dict:
+    """Pozycja radia -> maska wierszy; "Wszystkie" nie ma wpisu (bez zawężania)."""
+    return {view: as_mask(pred(months), len(months)) for view, pred in VIEW_PREDICATES.items()}
+
+
+class BitmapIndex:
+    """
+    Indeks odwrócony: nazwa -> {wartość -> bitmapa wierszy}.
+    Budowany raz na wersję danych; pozycje wierszy jak w ramce bazowej, z której powstał.
+    """
+
+    def __init__(self, n: int):
+        self.n = n
+        self._maps: dict[str, dict] = {}
+
+    def add_values(self, name: str, keys: pd.Series) -> "BitmapIndex":
+        """Bitmapa dla każdej niepustej wartości `keys` (jeden przebieg: factorize + sortowanie pozycji)."""
+        codes, uniques = pd.factorize(keys.astype(object))
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        maps = {}
+        for i, key in enumerate(uniques):
+            rows = np.zeros(self.n, dtype=bool)
+            rows[order[bounds[i]:bounds[i + 1]]] = True
+            maps[key] = np.packbits(rows)
+        self._maps[name] = maps
+        return self
+
+    def add_masks(self, name: str, masks: dict) -> "BitmapIndex":
+        """Gotowe maski (np. zakresy miesięcy) jako bitmapy."""
+        self._maps[name] = {key: to_bitmap(mask, self.n) for key, mask in masks.items()}
+        return self
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._maps
+
+    def bitmap(self, name: str, values) -> np.ndarray:
+        """OR bitmap wybranych wartości (nieznane wartości – brak wierszy)."""
+        out = np.zeros((self.n + 7) // 8, dtype=np.uint8)
+        maps = self._maps[name]
+        for v in values:
+            bits = maps.get(v)
+            if bits is not None:
+                out |= bits
+        return out
+
+    def options(self, name: str, within: np.ndarray | None = None) -> list:
+        """Posortowane wartości; z `within` – tylko te, które mają wiersze w tej bitmapie."""
+        maps = self._maps[name]
+        return sorted(k for k, bits in maps.items() if within is None or (bits & within).any())
+
+
+class FilterMask:
+    """Bitmapa wierszy nad ramką bazową (bez kopii); predykaty łączone przez AND, wiersze materializowane na końcu."""
+
+    def __init__(self, base: pd.DataFrame, index: BitmapIndex | None = None):
+        if index is not None and index.n != len(base):
+            raise ValueError(f"Indeks dla {index.n} wierszy, a ramka ma {len(base)}")
+        self.base = base
+        self.index = index
+        self.n = len(base)
+        self.bits = np.packbits(np.ones(self.n, dtype=bool))
+
+    def where(self, predicate) -> "FilterMask":
+        """Zawęża bitmapę predykatem wyrównanym pozycyjnie do ramki bazowej (None = bez zmian)."""
+        if predicate is not None:
+            self.bits &= to_bitmap(predicate, self.n)
+        return self
+
+    def where_in(self, name: str, values) -> "FilterMask":
+        """Zawężenie z indeksu: wiersze, w których `name` ma jedną z `values`."""
+        self.bits &= self.index.bitmap(name, values)
+        return self
+
+    def none(self) -> "FilterMask":
+        self.bits[:] = 0
+        return self
+
+    def count(self, bits: np.ndarray | None = None) -> int:
+        """Liczba wierszy po filtrach (opcjonalnie w przecięciu z dodatkową bitmapą – bez zmiany filtra)."""
+        return popcount(self.bits if bits is None else self.bits & bits)
+
+    def options(self, name: str) -> list:
+        """Wartości z indeksu występujące w wierszach po dotychczasowych filtrach."""
+        return self.index.options(name, within=self.bits)
+
+    @property
+    def mask(self) -> np.ndarray:
+        return np.unpackbits(self.bits, count=self.n).astype(bool)
+
+    def column(self, col: str) -> pd.Series:
+        """Jedna kolumna ograniczona do bieżących filtrów."""
+        return self.base[col][self.mask]
+
+    def frame(self, columns=None) -> pd.DataFrame:
+        """Materializacja: jedna kopia – tylko wiersze po filtrach i tylko wskazane kolumny."""
+        cols = list(self.base.columns) if columns is None else [c for c in columns if c in self.base.columns]
+        return self.base.loc[self.mask, cols]
@@ -0,0 +1,79 @@
+# utils/frames.py
+# Kompaktowe typy dla znormalizowanych ramek: kolumny o małej liczbie wartości -> category,
+# pozostały tekst -> string[pyarrow] (bez obiektów Pythona na każdą komórkę), bez zdublowanych kolumn źródłowych.
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+STRING_DTYPE = "string[pyarrow]" if PYARROW_AVAILABLE else "string"
+# kolumna tekstowa staje się kategorią, gdy unikalnych wartości jest najwyżej tyle (ułamek wierszy)
+CATEGORY_MAX_RATIO = 0.5
+# przy mniejszych ramkach liczność nic nie mówi – kategorie tylko dla wskazanych kolumn
+CATEGORY_MIN_ROWS = 50
+
+
+def rename_columns(df: pd.DataFrame, mapping: dict) -> pd.DataFrame:
+    """
+    Zmiana nazw źródło -> cel bez kopiowania kolumn. Pierwsze istniejące źródło danego celu wygrywa,
+    kolejne źródła tego samego celu są usuwane (wcześniej zostawały jako duplikaty).
+    """
+    rename, drop = {}, []
+    taken = set(df.columns)
+    for src, dst in mapping.items():
+        if src == dst or src not in df.columns or src in rename:
+            continue
+        if dst in taken:
+            drop.append(src)
+        else:
+            rename[src] = dst
+            taken.add(dst)
+    return df.drop(columns=drop).rename(columns=rename)
+
+
+def _is_text(s: pd.Series) -> bool:
+    if isinstance(s.dtype, pd.CategoricalDtype) or not (s.dtype == object or pd.api.types.is_string_dtype(s.dtype)):
+        return False
+    values = s.dropna()
+    return values.map(type).eq(str).all() if s.dtype == object else True
+
+
+def memory_mb(df: pd.DataFrame) -> float:
+    return float(df.memory_usage(deep=True).sum()) / 1024 ** 2
+
+
+def compact_frame(df: pd.DataFrame, categorical=(), keep=()) -> pd.DataFrame:
+    """
+    Kolumny tekstowe: wskazane w `categorical` albo o niskiej liczności -> category,
+    reszta -> STRING_DTYPE. Kolumny z mieszanymi typami (np. daty jako obiekty) i `keep` bez zmian.
+    W df.attrs["memory_mb"] zapisuje (przed, po).
+    """
+    before = memory_mb(df)
+    out = {}
+    n = len(df)
+    for c in df.columns:
+        s = df[c]
+        if c in keep or not _is_text(s):
+            continue
+        if c in categorical or (n >= CATEGORY_MIN_ROWS and s.nunique(dropna=True) <= CATEGORY_MAX_RATIO * n):
+            out[c] = s.astype("category")
+        else:
+            out[c] = s.astype(STRING_DTYPE)
+    # płytka kopia: pozostałe kolumny nie są kopiowane, podmieniane są tylko przekształcone
+    df = df.copy(deep=False)
+    for c, s in out.items():
+        df[c] = s
+    df.attrs["memory_mb"] = (round(before, 2), round(memory_mb(df), 2))
+    return df
+
+
+def memory_caption(df: pd.DataFrame) -> str:
+    before, after = df.attrs.get("memory_mb", (None, None))
+    if before is None:
+        return ""
+    saved = (1 - after / before) * 100 if before else 0.0
+    return f"Pamięć danych: {before:.1f} MB → {after:.1f} MB ({saved:.0f}% mniej)"
+
@@ -0,0 +1,167 @@
+# utils/gazetteer.py
+import os
+import re
+import csv
+import threading
+import unicodedata
+from typing import NamedTuple
+
+# Lokalne pliki gazeteru (rozdzielone os.pathsep); brakujące pliki są pomijane.
+# - data/gazetteer_pl.csv: kind,name,region,postcode,lat,lon (kind: voivodeship / city / postcode)
+# - data/PL.txt: zrzut kodów pocztowych GeoNames (download.geonames.org/export/zip/PL.zip)
+GAZETTEER_PATHS = os.getenv(
+    "GAZETTEER_PATHS",
+    os.pathsep.join([os.path.join("data", "gazetteer_pl.csv"), os.path.join("data", "PL.txt")]),
+)
+
+COUNTRY_NAMES = {"poland", "polska", "pl"}
+POSTCODE_RX = re.compile(r"^(\d{2}-\d{3})\s*(.*)$")
+
+
+class GazetteerLocation(NamedTuple):
+    # te same atrybuty co geopy.Location, więc wynik pasuje do istniejącego kodu
+    latitude: float
+    longitude: float
+    address: str
+    kind: str
+
+
+def normalize_name(s: str) -> str:
+    s = str(s or "").strip().lower().replace("ł", "l")
+    s = unicodedata.normalize("NFKD", s)
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    s = re.sub(r"^(woj\.|wojewodztwo)\s+", "", s)
+    return re.sub(r"\s+", " ", s)
+
+
+class Gazetteer:
+    """
+    Offline'owy geokoder zgrubny (kod pocztowy / miasto / województwo) dla Polski.
+    Odpowiada tylko na zapytania, których każdy człon rozpozna w indeksie, np.
+    "Kraków, małopolskie, Poland", "00-113 Warszawa, Poland", "pomorskie, Poland".
+    Adresy z ulicą zwracają None – te idą do geokodera sieciowego.
+    """
+
+    def __init__(self):
+        self.postcodes: dict[str, tuple] = {}
+        self.cities: dict[str, list[tuple]] = {}
+        self.regions: dict[str, tuple] = {}
+
+    def __len__(self):
+        return len(self.postcodes) + sum(len(v) for v in self.cities.values()) + len(self.regions)
+
+    # ---------- ładowanie ----------
+    def add(self, kind: str, name: str, lat: float, lon: float, region: str = "", postcode: str = ""):
+        entry = (float(lat), float(lon), str(name), normalize_name(region))
+        if kind == "voivodeship":
+            self.regions[normalize_name(name)] = entry
+        elif kind == "city":
+            self.cities.setdefault(normalize_name(name), []).append(entry)
+        elif kind == "postcode" and postcode:
+            self.postcodes[postcode.strip()] = entry
+
+    def load_csv(self, path: str):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for r in csv.DictReader(f):
+                try:
+                    self.add(r["kind"], r["name"], r["lat"], r["lon"], r.get("region", ""), r.get("postcode", ""))
+                except (KeyError, ValueError):
+                    continue
+
+    def load_geonames(self, path: str):
+        # kod pocztowy -> punkt; miasto -> średnia z jego kodów pocztowych
+        acc: dict[tuple, list[float]] = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                cols = line.rstrip("\n").split("\t")
+                if len(cols) < 11:
+                    continue
+                try:
+                    lat, lon = float(cols[9]), float(cols[10])
+                except ValueError:
+                    continue
+                postcode, place, region = cols[1], cols[2], cols[3]
+                self.add("postcode", place, lat, lon, region=region, postcode=postcode)
+                a = acc.setdefault((place, region), [0.0, 0.0, 0])
+                a[0] += lat
+                a[1] += lon
+                a[2] += 1
+        for (place, region), (slat, slon, n) in acc.items():
+            key = normalize_name(place)
+            if any(e[3] == normalize_name(region) for e in self.cities.get(key, [])):
+                continue
+            self.add("city", place, slat / n, slon / n, region=region)
+
+    def load(self, path: str):
+        if path.lower().endswith(".txt"):
+            self.load_geonames(path)
+        else:
+            self.load_csv(path)
+
+    # ---------- wyszukiwanie ----------
+    def _city(self, name: str, region_key: str | None):
+        entries = self.cities.get(normalize_name(name))
+        if not entries:
+            return None
+        if region_key:
+            # miasto o tej nazwie jest, ale w innym województwie – nie zgadujemy, niech zapyta dalszy wariant/dostawca
+            return next((e for e in entries if e[3] == region_key), None)
+        return entries[0]
+
+    def geocode(self, query: str):
+        parts = [p.strip() for p in str(query or "").split(",") if p.strip()]
+        # inny kraj nie przejdzie – nieznany człon kończy wyszukiwanie wynikiem None
+        if parts and normalize_name(parts[-1]) in COUNTRY_NAMES:
+            parts = parts[:-1]
+        if not parts:
+            return None
+
+        region_key = None
+        for p in parts:
+            if normalize_name(p) in self.regions:
+                region_key = normalize_name(p)
+
+        best = None
+        for p in parts:
+            key = normalize_name(p)
+            if key == region_key:
+                continue
+            m = POSTCODE_RX.match(p)
+            if m:
+                hit = self.postcodes.get(m.group(1))
+                if hit is not None:
+                    best = GazetteerLocation(hit[0], hit[1], p, "postcode")
+                    continue
+                p = m.group(2)
+                if not p:
+                    return None
+            city = self._city(p, region_key)
+            if city is None:
+                # człon spoza indeksu (np. ulica) – to nie jest zapytanie zgrubne
+                return None
+            if best is None:
+                best = GazetteerLocation(city[0], city[1], city[2], "city")
+
+        if best is None and region_key:
+            r = self.regions[region_key]
+            best = GazetteerLocation(r[0], r[1], r[2], "voivodeship")
+        return best
+
+    __call__ = geocode
+
+
+_gazetteer_lock = threading.Lock()
+_gazetteer: Gazetteer | None = None
+
+
+def get_gazetteer() -> Gazetteer | None:
+    """Gazeter ładowany raz na proces; None, gdy żaden plik nie istnieje."""
+    global _gazetteer
+    with _gazetteer_lock:
+        if _gazetteer is None:
+            g = Gazetteer()
+            for path in GAZETTEER_PATHS.split(os.pathsep):
+                if path and os.path.exists(path):
+                    g.load(path)
+            _gazetteer = g
+        return _gazetteer if len(_gazetteer) else None
@@ -0,0 +1,151 @@
+# utils/geocode_worker.py
+import os
+import time
+import heapq
+import queue
+import itertools
+import threading
+
+from utils.geocoding import GeocodeCache, get_geocode_cache, get_nominatim_geocoder
+
+# Geokodowanie całych plików w tle (wyłączenie: GEOCODE_BACKGROUND=0)
+BACKGROUND_GEOCODING = os.getenv("GEOCODE_BACKGROUND", "1") != "0"
+# po błędzie sieci / limicie rekord wraca do kolejki dopiero po tym czasie (kolejne próby: ×2, ×4…);
+# w międzyczasie worker zajmuje się pozostałymi rekordami
+ERROR_BACKOFF_SECONDS = 30
+# ile razy próbować rekord po błędzie sieci, zanim zostanie policzony jako błąd (do ponownego zgłoszenia pliku)
+MAX_ATTEMPTS = 4
+
+
+class GeocodeWorker:
+    """
+    Jeden wątek w tle + kolejka zadań. Zadanie = krotka wariantów adresu jednego rekordu
+    (od najdokładniejszego); pierwszy trafiony wariant kończy zadanie.
+
+    Wyniki (trafienia i braki) idą do trwałego GeocodeCache, więc po restarcie
+    ponowne zgłoszenie tego samego pliku przechodzi znane adresy bez sieci.
+    `geocode` to funkcja adres -> location|None, zwykle RateLimiter(Nominatim.geocode);
+    w testach można podać lokalny zamiennik.
+    """
+
+    def __init__(self, geocode, provider: str, cache: GeocodeCache | None = None,
+                 error_backoff: float = ERROR_BACKOFF_SECONDS, max_attempts: int = MAX_ATTEMPTS):
+        self.geocode = geocode
+        self.provider = provider
+        self.cache = cache or get_geocode_cache()
+        self.error_backoff = error_backoff
+        self.max_attempts = max_attempts
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._versions: dict[str, object] = {}
+        self._progress: dict[str, dict] = {}
+        self._thread: threading.Thread | None = None
+        # odłożone ponowienia: kopiec (not_before, nr, zadanie) – wracają do kolejki, gdy minie not_before
+        self._deferred: list[tuple] = []
+        self._seq = itertools.count()
+
+    def is_submitted(self, dataset: str, version) -> bool:
+        with self._lock:
+            return self._versions.get(dataset) == version
+
+    def submit(self, dataset: str, version, jobs):
+        """Zgłasza rekordy zbioru; nowa wersja zbioru unieważnia zadania poprzedniej."""
+        jobs = (tuple(a for a in j if a) for j in jobs)
+        uniq = list(dict.fromkeys(j for j in jobs if j))
+        with self._lock:
+            self._versions[dataset] = version
+            self._progress[dataset] = {"total": len(uniq), "done": 0, "found": 0, "errors": 0}
+        for job in uniq:
+            self._queue.put((dataset, version, job, 1))
+        self._ensure_thread()
+
+    def progress(self, dataset: str) -> dict:
+        with self._lock:
+            return dict(self._progress.get(dataset, {"total": 0, "done": 0, "found": 0, "errors": 0}))
+
+    def join(self, timeout: float | None = None) -> bool:
+        """Czeka na opróżnienie kolejki (przydatne w testach). True, jeśli zdążyło."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks or self._deferred:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="geocode-worker", daemon=True)
+                self._thread.start()
+
+    def _defer(self, item: tuple, delay: float):
+        with self._lock:
+            heapq.heappush(self._deferred, (time.monotonic() + delay, next(self._seq), item))
+
+    def _release_due(self) -> float | None:
+        """Przenosi do kolejki ponowienia, których czas minął; zwraca sekundy do następnego (None = brak)."""
+        now = time.monotonic()
+        with self._lock:
+            while self._deferred and self._deferred[0][0] <= now:
+                self._queue.put(heapq.heappop(self._deferred)[2])
+            return max(self._deferred[0][0] - now, 0.01) if self._deferred else None
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self._release_due())
+            except queue.Empty:
+                continue
+            dataset, version, job, attempt = item
+            try:
+                if self.is_submitted(dataset, version):
+                    self._process(dataset, version, job, attempt)
+            finally:
+                self._queue.task_done()
+
+    def _process(self, dataset: str, version, job: tuple, attempt: int = 1):
+        found = error = False
+        for addr in job:
+            known, lat, lon = self.cache.lookup(addr, self.provider)
+            if not known:
+                try:
+                    loc = self.geocode(addr)
+                except Exception:
+                    error = True
+                    break
+                lat, lon = (float(loc.latitude), float(loc.longitude)) if loc else (None, None)
+                self.cache.store(addr, self.provider, lat, lon)
+            if lat is not None and lon is not None:
+                found = True
+                break
+
+        if error and attempt < self.max_attempts:
+            # błąd przejściowy nie jest wynikiem: rekord wraca do kolejki po coraz dłuższej przerwie
+            # (adresy znane już z cache nie idą wtedy do sieci), pozostałe rekordy idą bez czekania
+            self._defer((dataset, version, job, attempt + 1), self.error_backoff * 2 ** (attempt - 1))
+            return
+
+        with self._lock:
+            if self._versions.get(dataset) == version:
+                p = self._progress[dataset]
+                p["done"] += 1
+                p["found"] += int(found)
+                p["errors"] += int(error)
+
+
+_worker_lock = threading.Lock()
+_workers: dict[str, GeocodeWorker] = {}
+
+
+def get_geocode_worker(provider: str = "nominatim", geocode=None) -> GeocodeWorker:
+    """
+    Jeden worker na providera w procesie. Domyślnie geokoduje przez wspólny limiter
+    utils.geocoding.get_nominatim_geocoder – ten sam, którego używają strony przy zapytaniach na żądanie,
+    więc worker i strony razem mieszczą się w limicie Nominatim.
+    """
+    with _worker_lock:
+        worker = _workers.get(provider)
+        if worker is None:
+            worker = GeocodeWorker(geocode or get_nominatim_geocoder(), provider)
+            _workers[provider] = worker
+        return worker
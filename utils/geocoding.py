@@ -0,0 +1,150 @@
+# utils/geocoding.py
+import os
+import re
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# geokodowanie sieciowe – wymaga: pip install geopy
+try:
+    from geopy.geocoders import Nominatim
+    from geopy.extra.rate_limiter import RateLimiter
+    GEOCODING_AVAILABLE = True
+except ImportError:
+    GEOCODING_AVAILABLE = False
+
+# Trwały cache geokodowania (SQLite) – wspólny dla stron i sesji, przeżywa restart.
+GEOCODE_CACHE_PATH = os.getenv("GEOCODE_CACHE_PATH", os.path.join(".cache", "geocode.sqlite"))
+# polityka Nominatim: najwyżej 1 zapytanie/s z całej aplikacji
+NOMINATIM_MIN_DELAY_SECONDS = 1.0
+NOMINATIM_USER_AGENT = "breeam_leed_app"
+# "brak wyniku" też zapamiętujemy, ale po tym czasie warto spróbować ponownie
+MISS_TTL_SECONDS = 60 * 60 * 24 * 30
+
+
+def normalize_address(address: str) -> str:
+    s = str(address or "").strip().lower()
+    s = re.sub(r"\s*,\s*", ", ", s)
+    s = re.sub(r"\s+", " ", s)
+    return s.strip(" ,")
+
+
+class GeocodeCache:
+    """
+    Klucz: (provider, znormalizowany adres). Wartość: lat/lon albo brak wyniku (found=0).
+    Każde wywołanie otwiera własne połączenie, WAL pozwala czytać równolegle z zapisem.
+    """
+
+    def __init__(self, path: str = GEOCODE_CACHE_PATH, miss_ttl: float = MISS_TTL_SECONDS):
+        self.path = path
+        self.miss_ttl = miss_ttl
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with self._connect() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS geocode (
+                    provider   TEXT NOT NULL,
+                    key        TEXT NOT NULL,
+                    query      TEXT NOT NULL,
+                    lat        REAL,
+                    lon        REAL,
+                    found      INTEGER NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (provider, key)
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=30)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def lookup(self, address: str, provider: str):
+        """Zwraca (znany, lat, lon). Dla przeterminowanego braku wyniku -> (False, None, None)."""
+        with self._connect() as con:
+            row = con.execute(
+                "SELECT lat, lon, found, updated_at FROM geocode WHERE provider = ? AND key = ?",
+                (provider, normalize_address(address)),
+            ).fetchone()
+        if row is None:
+            return False, None, None
+        lat, lon, found, updated_at = row
+        if found:
+            return True, float(lat), float(lon)
+        if time.time() - updated_at > self.miss_ttl:
+            return False, None, None
+        return True, None, None
+
+    def store(self, address: str, provider: str, lat: float | None, lon: float | None):
+        found = lat is not None and lon is not None
+        with self._connect() as con:
+            con.execute(
+                """
+                INSERT INTO geocode (provider, key, query, lat, lon, found, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(provider, key) DO UPDATE SET
+                    query = excluded.query, lat = excluded.lat, lon = excluded.lon,
+                    found = excluded.found, updated_at = excluded.updated_at
+                """,
+                (provider, normalize_address(address), str(address), lat, lon, int(found), time.time()),
+            )
+
+
+_cache_lock = threading.Lock()
+_cache: GeocodeCache | None = None
+
+
+def get_geocode_cache() -> GeocodeCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = GeocodeCache()
+        return _cache
+
+
+_nominatim_lock = threading.Lock()
+_nominatim = None
+
+
+def get_nominatim_geocoder():
+    """
+    Jeden RateLimiter(Nominatim.geocode) na proces – wszystkie strony, sesje i worker w tle
+    dzielą limit zapytań. None, gdy brak geopy. Błędy sieci nie są połykane (nie trafiają do cache jako brak wyniku).
+    """
+    global _nominatim
+    if not GEOCODING_AVAILABLE:
+        return None
+    with _nominatim_lock:
+        if _nominatim is None:
+            geolocator = Nominatim(user_agent=NOMINATIM_USER_AGENT)
+            _nominatim = RateLimiter(
+                geolocator.geocode, min_delay_seconds=NOMINATIM_MIN_DELAY_SECONDS, swallow_exceptions=False,
+            )
+        return _nominatim
+
+
+def geocode_with_cache(address: str, geocode, provider: str, offline_only: bool = False):
+    """
+    (lat, lon) dla adresu: najpierw trwały cache, potem (opcjonalnie) geokoder.
+    Wyjątek geokodera (sieć, limit) nie jest zapisywany jako brak wyniku.
+    """
+    cache = get_geocode_cache()
+    known, lat, lon = cache.lookup(address, provider)
+    if known or offline_only or geocode is None:
+        return lat, lon
+    try:
+        loc = geocode(address)
+    except Exception:
+        return None, None
+    lat, lon = (float(loc.latitude), float(loc.longitude)) if loc else (None, None)
+    cache.store(address, provider, lat, lon)
+    return lat, lon
@@ -0,0 +1,64 @@
+# utils/http.py
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Konfiguracja (ENV): rozmiar puli połączeń, timeouty connect/read, liczba ponowień
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "10"))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def make_retry(retries: int = HTTP_MAX_RETRIES) -> Retry:
+    """Ponowienia z wykładniczym backoffem (0.5s, 1s, 2s… max HTTP_BACKOFF_MAX) dla GET."""
+    kwargs = dict(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    try:
+        return Retry(backoff_max=HTTP_BACKOFF_MAX, **kwargs)
+    except TypeError:
+        # urllib3 < 2 nie ma backoff_max w konstruktorze (limit domyślny)
+        return Retry(**kwargs)
+
+
+def make_session(pool_size: int = HTTP_POOL_SIZE, retries: int = HTTP_MAX_RETRIES) -> requests.Session:
+    """Session z keep-alive (pula połączeń), gzip i ponowieniami."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=make_retry(retries))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip, deflate"})
+    return session
+
+
+_session_lock = threading.Lock()
+_session: requests.Session | None = None
+
+
+def get_session() -> requests.Session:
+    """Jedna Session na proces – wspólna pula połączeń dla wszystkich sesji Streamlit."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = make_session()
+        return _session
+
+
+def default_timeout() -> tuple[float, float]:
+    return HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
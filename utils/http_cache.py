@@ -0,0 +1,140 @@
+# utils/http_cache.py
+# Trwały cache odpowiedzi HTTP (SQLite) z walidatorami: ETag / Last-Modified.
+# Przy kolejnym zapytaniu wysyłamy If-None-Match / If-Modified-Since – 304 = treść z dysku, bez pobierania.
+# Gdy serwer nie podaje walidatorów, odpowiedź jest ważna przez HTTP_CACHE_TTL sekund.
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+from utils.http import default_timeout, get_session
+
+HTTP_CACHE_PATH = os.getenv("HTTP_CACHE_PATH", os.path.join(".cache", "http.sqlite"))
+HTTP_CACHE_TTL = float(os.getenv("HTTP_CACHE_TTL", str(60 * 30)))
+
+
+def cache_key(url: str, params=None) -> str:
+    return requests.Request("GET", url, params=params).prepare().url
+
+
+class HttpCache:
+    """Klucz: pełny URL z parametrami. Zapisywane są tylko odpowiedzi 200."""
+
+    def __init__(self, path: str = HTTP_CACHE_PATH):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with self._connect() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key           TEXT PRIMARY KEY,
+                    etag          TEXT,
+                    last_modified TEXT,
+                    content_type  TEXT,
+                    body          BLOB NOT NULL,
+                    stored_at     REAL NOT NULL,
+                    validated_at  REAL NOT NULL
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=30)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def lookup(self, key: str) -> dict | None:
+        with self._connect() as con:
+            row = con.execute(
+                "SELECT etag, last_modified, content_type, body, stored_at, validated_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, content_type, body, stored_at, validated_at = row
+        return {
+            "etag": etag, "last_modified": last_modified, "content_type": content_type,
+            "body": bytes(body), "stored_at": stored_at, "validated_at": validated_at,
+        }
+
+    def store(self, key: str, response: requests.Response) -> None:
+        now = time.time()
+        with self._connect() as con:
+            con.execute(
+                """
+                INSERT OR REPLACE INTO responses (key, etag, last_modified, content_type, body, stored_at, validated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    key, response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                    response.headers.get("Content-Type"), response.content, now, now,
+                ),
+            )
+
+    def touch(self, key: str) -> None:
+        with self._connect() as con:
+            con.execute("UPDATE responses SET validated_at = ? WHERE key = ?", (time.time(), key))
+
+
+_cache_lock = threading.Lock()
+_cache: HttpCache | None = None
+
+
+def get_http_cache() -> HttpCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = HttpCache()
+        return _cache
+
+
+def _from_cache(entry: dict, url: str, source: str) -> requests.Response:
+    r = requests.Response()
+    r.status_code = 200
+    r.url = url
+    r._content = entry["body"]
+    if entry["content_type"]:
+        r.headers["Content-Type"] = entry["content_type"]
+    r.from_cache = source
+    return r
+
+
+def cached_get(url: str, params=None, headers=None, ttl: float = HTTP_CACHE_TTL, session=None, **kwargs) -> requests.Response:
+    """
+    GET przez trwały cache. Atrybut `from_cache` odpowiedzi:
+    "fresh" (w TTL, bez zapytania), "revalidated" (304), "" (pobrana treść).
+    """
+    cache = get_http_cache()
+    key = cache_key(url, params)
+    entry = cache.lookup(key)
+    has_validators = bool(entry and (entry["etag"] or entry["last_modified"]))
+
+    if entry is not None and not has_validators and time.time() - entry["validated_at"] < ttl:
+        return _from_cache(entry, key, "fresh")
+
+    headers = dict(headers or {})
+    if has_validators:
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    kwargs.setdefault("timeout", default_timeout())
+    r = (session or get_session()).get(url, params=params, headers=headers, **kwargs)
+    if r.status_code == 304 and entry is not None:
+        cache.touch(key)
+        return _from_cache(entry, key, "revalidated")
+    if r.status_code == 200:
+        cache.store(key, r)
+    r.from_cache = ""
+    return r
@@ -0,0 +1,52 @@
+# utils/json_stream.py
+from typing import Iterable, Iterator
+
+import pandas as pd
+
+# strumieniowy parser JSON (opcjonalny) – bez niego czytamy całą odpowiedź naraz
+IJSON_AVAILABLE = True
+try:
+    import ijson
+    from ijson.common import ObjectBuilder
+except ImportError:
+    IJSON_AVAILABLE = False
+
+STREAM_CHUNK_ROWS = 500
+
+
+def iter_json_items(fileobj, prefixes) -> Iterator[dict]:
+    """
+    Zwraca kolejne obiekty spod podanych ścieżek ijson (np. "results.assessments.assessment.item"),
+    budując w pamięci tylko jeden rekord naraz. Ścieżka bez ".item" łapie pojedynczy obiekt
+    (API zwraca dict zamiast listy, gdy jest tylko jeden rekord).
+    """
+    prefixes = set(prefixes)
+    builder = None
+    depth = 0
+    for prefix, event, value in ijson.parse(fileobj, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if event in ("start_map", "start_array"):
+                depth += 1
+            elif event in ("end_map", "end_array"):
+                depth -= 1
+                if depth == 0:
+                    yield builder.value
+                    builder = None
+        elif event == "start_map" and prefix in prefixes:
+            builder = ObjectBuilder()
+            builder.event(event, value)
+            depth = 1
+
+
+def iter_frames(items: Iterable[dict], chunk_rows: int = STREAM_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Grupuje rekordy w DataFrame'y po chunk_rows wierszy."""
+    chunk = []
+    for item in items:
+        if isinstance(item, dict):
+            chunk.append(item)
+        if len(chunk) >= chunk_rows:
+            yield pd.DataFrame(chunk)
+            chunk = []
+    if chunk:
+        yield pd.DataFrame(chunk)
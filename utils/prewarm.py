@@ -0,0 +1,149 @@
+# utils/prewarm.py
+# Rozgrzewanie cache przy starcie: /countries, /schemes, domyślne /assessments (synchronizacja
+# do lokalnej kopii) i gotowe ramki stron z plików Excel (BREEAM wygasłe, LEED) – w wątkach w tle,
+# zanim przyjdzie pierwszy użytkownik.
+#
+# W aplikacji: start_prewarm() z app.py i z każdej strony (raz na proces – także przy wejściu
+# prosto na podstronę po restarcie).
+# Przed startem serwera (cache są na dysku, więc serwer je przejmie):
+#     python -m utils.prewarm && streamlit run app.py
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.datasets import DATASETS, leed_columns, load_breeam_excel, load_leed_df
+from utils.sources import LEED_CORE_COLUMNS
+
+
+def _env_list(key: str, default: str) -> list[str]:
+    return [x.strip() for x in os.getenv(key, default).split(",") if x.strip()]
+
+
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "1") == "1"
+# państwa i scheme (nazwy jak w /schemes) do pobrania przy starcie
+PREWARM_COUNTRIES = _env_list("PREWARM_COUNTRIES", "Poland")
+PREWARM_SCHEMES = _env_list("PREWARM_SCHEMES", "In-Use")
+# 1 = strona główna czeka (z limitem PREWARM_TIMEOUT s), aż cache będzie gotowy
+PREWARM_BLOCKING = os.getenv("PREWARM_BLOCKING", "0") == "1"
+PREWARM_TIMEOUT = float(os.getenv("PREWARM_TIMEOUT", "120"))
+# pliki jak na stronach (BREEAM_HIST_PATH, LEED_PATH) – ta sama ścieżka = ten sam klucz cache
+PREWARM_BREEAM_EXCEL_PATH = os.getenv("PREWARM_BREEAM_EXCEL_PATH", "BREEAM.xlsx")
+PREWARM_LEED_PATH = os.getenv("PREWARM_LEED_PATH", "PublicLEEDProjectDirectory.xlsx")
+
+
+def _warm_assessments(countries: list[str], scheme_names: list[str]):
+    from utils.breeam_api import breeam_schemes_df, fetch_assessments, sync_breeam
+
+    df_schemes, _ = breeam_schemes_df()
+    ids = {}
+    if not df_schemes.empty:
+        ids = dict(zip(df_schemes["schemeName"].str.strip().str.lower(), df_schemes["schemeID"]))
+    parts = []
+    for name in scheme_names:
+        sid = ids.get(name.strip().lower())
+        if sid is None:
+            raise ValueError(f"Nie ma scheme '{name}' w /schemes")
+        for c in countries:
+            parts.append(((c, int(sid), name), fetch_assessments(c, int(sid))))
+    return sync_breeam(parts)
+
+
+def _warm_leed(path: str):
+    # te same argumenty co strona LEED bez dodatkowych kolumn -> te same wpisy w shared_cache
+    mtime = os.path.getmtime(path)
+    leed_columns(path, mtime)
+    return load_leed_df(path, mtime, tuple(LEED_CORE_COLUMNS))
+
+
+def default_tasks() -> dict:
+    """nazwa -> funkcja bez argumentów; kolejność = kolejność startu."""
+    from utils.breeam_api import breeam_countries, breeam_schemes_df, credentials_ok
+
+    tasks = {}
+    if credentials_ok():
+        tasks["BREEAM /countries"] = breeam_countries
+        tasks["BREEAM /schemes"] = breeam_schemes_df
+        if PREWARM_COUNTRIES and PREWARM_SCHEMES:
+            label = f"BREEAM /assessments ({', '.join(PREWARM_COUNTRIES)} × {', '.join(PREWARM_SCHEMES)})"
+            tasks[label] = lambda: _warm_assessments(PREWARM_COUNTRIES, PREWARM_SCHEMES)
+    # gotowe ramki (po normalizacji i expiry), nie tylko Parquet – Parquet powstaje po drodze
+    if PREWARM_BREEAM_EXCEL_PATH and os.path.exists(PREWARM_BREEAM_EXCEL_PATH):
+        tasks[f"BREEAM Excel {PREWARM_BREEAM_EXCEL_PATH}"] = (
+            lambda p=PREWARM_BREEAM_EXCEL_PATH: DATASETS.get("breeam_excel", p, load_breeam_excel)
+        )
+    if PREWARM_LEED_PATH and os.path.exists(PREWARM_LEED_PATH):
+        tasks[f"LEED {PREWARM_LEED_PATH}"] = lambda p=PREWARM_LEED_PATH: _warm_leed(p)
+    return tasks
+
+
+class Prewarm:
+    """Uruchamia zadania równolegle; `timings` – stan, czas i błąd każdego zadania."""
+
+    def __init__(self, tasks: dict, workers: int = 4):
+        self.tasks = tasks
+        self.workers = workers
+        self.timings: dict[str, dict] = {name: {"status": "oczekuje", "seconds": None, "error": ""} for name in tasks}
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self._done = threading.Event()
+
+    def _run_one(self, name: str, fn) -> None:
+        self.timings[name]["status"] = "w toku"
+        t0 = time.perf_counter()
+        try:
+            fn()
+            self.timings[name]["status"] = "gotowe"
+        except Exception as e:
+            self.timings[name].update(status="błąd", error=str(e))
+        self.timings[name]["seconds"] = round(time.perf_counter() - t0, 3)
+
+    def _run(self) -> None:
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, self.workers), thread_name_prefix="prewarm") as ex:
+                for name, fn in self.tasks.items():
+                    ex.submit(self._run_one, name, fn)
+        finally:
+            self.finished_at = time.time()
+            self._done.set()
+
+    def start(self) -> "Prewarm":
+        self.started_at = time.time()
+        threading.Thread(target=self._run, name="prewarm", daemon=True).start()
+        return self
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._done.wait(timeout)
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def total_seconds(self) -> float | None:
+        if self.started_at is None:
+            return None
+        return round((self.finished_at or time.time()) - self.started_at, 3)
+
+
+_prewarm_lock = threading.Lock()
+_prewarm: Prewarm | None = None
+
+
+def start_prewarm() -> Prewarm | None:
+    """Raz na proces (kolejne wywołania zwracają ten sam obiekt); None, gdy wyłączone."""
+    global _prewarm
+    if not PREWARM_ENABLED:
+        return None
+    with _prewarm_lock:
+        if _prewarm is None:
+            _prewarm = Prewarm(default_tasks()).start()
+        return _prewarm
+
+
+if __name__ == "__main__":
+    warm = Prewarm(default_tasks()).start()
+    warm.wait(PREWARM_TIMEOUT)
+    for name, t in warm.timings.items():
+        print(f"{t['seconds'] if t['seconds'] is not None else '-':>8}s  {t['status']:<9} {name}  {t['error']}")
+    print(f"{warm.total_seconds:>8}s  razem")
@@ -0,0 +1,212 @@
+# utils/search.py
+# Wyszukiwanie projektów po nazwie: bez wielkości liter i polskich znaków, prefiksy słów + trigramy.
+# Indeks budowany raz na wersję danych; do przeglądarki trafia tylko top-N trafień,
+# a wybrany wiersz to słownik klucz -> pozycja (project_id / certificate_number), bez skanowania ramki.
+import re
+import unicodedata
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+SEARCH_TOP_N = 50
+# minimalny udział wspólnych trigramów zapytania, żeby literówka była jeszcze trafieniem
+TRIGRAM_MIN_SIMILARITY = 0.4
+# litery, których NFKD nie rozkłada na literę bazową + znak diakrytyczny
+_FOLD = str.maketrans({"ł": "l", "Ł": "l", "đ": "d", "Đ": "d", "ø": "o", "Ø": "o", "ı": "i"})
+_COMBINING = re.compile(r"[\u0300-\u036f]")
+_SEPARATORS = re.compile(r"[\W_]+")
+
+
+def normalize_text(value) -> str:
+    """Małe litery, bez diakrytyków i interpunkcji, pojedyncze spacje ("Łódź-Fabryczna" -> "lodz fabryczna")."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    text = _COMBINING.sub("", unicodedata.normalize("NFKD", str(value).translate(_FOLD)))
+    return _SEPARATORS.sub(" ", text.casefold()).strip()
+
+
+def _trigrams(words) -> set[str]:
+    out = set()
+    for w in words:
+        w = f" {w} "
+        out.update(w[i:i + 3] for i in range(len(w) - 2))
+    return out
+
+
+def row_keys(df: pd.DataFrame, candidates=()) -> list[str]:
+    """Stabilny klucz wiersza: pierwsza kolumna z `candidates` o unikalnych, niepustych wartościach; inaczej etykieta indeksu."""
+    for c in candidates:
+        if c in df.columns and df[c].notna().all():
+            keys = df[c].astype(str).tolist()
+            if len(set(keys)) == len(keys):
+                return keys
+    return [f"#{i}" for i in df.index]
+
+
+def _normalize_column(values) -> pd.Series:
+    values = pd.Series(list(values), dtype=object)
+    # wartości się powtarzają – normalizacja raz na unikalną wartość
+    return values.map({x: normalize_text(x) for x in values.dropna().unique()}).fillna("")
+
+
+class SearchIndex:
+    """
+    Słowa w posortowanym słowniku (prefiks = zakres w bisect), trigramy -> słowa słownika.
+    Ranking: cała nazwa zaczyna się od zapytania, potem każde słowo zapytania jest prefiksem
+    słowa nazwy (lub pól z `extra`), potem podobieństwo trigramowe (literówki, fragmenty w środku słowa).
+    """
+
+    def __init__(self, keys: list[str], names, labels=None, extra=None):
+        self.keys = list(keys)
+        self.labels = [str(x) for x in (names if labels is None else labels)]
+        self._pos = {k: i for i, k in enumerate(self.keys)}
+        norm = _normalize_column(names)
+        self._norm = norm.tolist()
+        self.n = len(self.keys)
+        if extra is not None:
+            # dodatkowe pola (miasto, adres, numer…) – przeszukiwane, ale bez wpływu na poziom "nazwa zaczyna się od"
+            norm = norm + " " + _normalize_column(extra)
+
+        # pary (słowo, wiersz) posortowane po słowie: słownik + pozycje kolejnych słów w jednej tablicy
+        # (prefiks -> zakres słownika -> ciągły wycinek pozycji)
+        pairs = norm.str.split().explode().dropna()
+        pairs = pd.DataFrame({"word": pairs.to_numpy(dtype=object), "row": pairs.index.to_numpy(dtype=np.int64)})
+        pairs = pairs.drop_duplicates().sort_values(["word", "row"], kind="stable")
+        vocab, starts = np.unique(pairs["word"].to_numpy(dtype=object), return_index=True)
+        self._vocab = vocab.tolist()
+        self._offsets = np.append(starts, len(pairs)).astype(np.int64)
+        self._word_rows = pairs["row"].to_numpy(dtype=np.int64)
+        # trigramy liczone na słowniku (mniejszym niż liczba wierszy), wiersze przez pozycje słów
+        tri_words: dict[str, list[int]] = {}
+        for wid, w in enumerate(self._vocab):
+            for t in _trigrams((w,)):
+                tri_words.setdefault(t, []).append(wid)
+        self._tri = {t: np.array(ids, dtype=np.int64) for t, ids in tri_words.items()}
+
+    def label(self, key: str) -> str:
+        pos = self._pos.get(key)
+        return "" if pos is None else self.labels[pos]
+
+    def position(self, key: str) -> int | None:
+        """Pozycja wiersza w ramce bazowej dla klucza (słownik, bez skanowania)."""
+        return self._pos.get(key)
+
+    def _trigram_rows(self, gram: str) -> np.ndarray:
+        """Wiersze zawierające trigram (każdy wiersz raz, choćby miał go w kilku słowach)."""
+        ids = self._tri.get(gram)
+        if ids is None:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate([self._word_rows[self._offsets[i]:self._offsets[i + 1]] for i in ids]))
+
+    def _prefix_rows(self, word: str) -> np.ndarray:
+        lo = bisect_left(self._vocab, word)
+        hi = bisect_left(self._vocab, word + "\uffff")
+        return self._word_rows[self._offsets[lo]:self._offsets[hi]]
+
+    def rank(self, q: str, allowed: np.ndarray) -> tuple[np.ndarray, ...]:
+        """
+        Kandydaci dla znormalizowanego zapytania `q`: (pozycje, poziom, podobieństwo, długość nazwy).
+        Sortowanie po (poziom, -podobieństwo, długość) – także przy łączeniu wyników kilku indeksów.
+        """
+        words = q.split()
+        prefix = allowed.copy()
+        for w in words:
+            hit = np.zeros(self.n, dtype=bool)
+            hit[self._prefix_rows(w)] = True
+            prefix &= hit
+
+        grams = _trigrams(words)
+        shared = np.bincount(np.concatenate([self._trigram_rows(t) for t in grams]), minlength=self.n)
+        similarity = shared / max(len(grams), 1)
+
+        candidates = np.flatnonzero(prefix | (allowed & (similarity >= TRIGRAM_MIN_SIMILARITY)))
+        tier = np.where(prefix[candidates], 1, 2)
+        starts = np.array([self._norm[i].startswith(q) for i in candidates], dtype=bool)
+        tier[starts] = 0
+        lengths = np.array([len(self._norm[i]) for i in candidates], dtype=np.int64)
+        return candidates, tier, similarity[candidates], lengths
+
+    def search(self, query: str, top_n: int = SEARCH_TOP_N, within: np.ndarray | None = None) -> list[str]:
+        """Klucze najlepszych trafień; `within` – maska bool dozwolonych wierszy (np. po filtrach)."""
+        allowed = np.ones(self.n, dtype=bool) if within is None else np.asarray(within, dtype=bool)
+        q = normalize_text(query)
+        if not q:
+            # bez zapytania – pierwsze wiersze w kolejności ramki (jak dotychczasowa lista)
+            return [self.keys[i] for i in np.flatnonzero(allowed)[:top_n]]
+        candidates, tier, similarity, lengths = self.rank(q, allowed)
+        # lexsort: ostatni klucz najważniejszy – poziom, podobieństwo malejąco, krótsza nazwa, kolejność w ramce
+        order = np.lexsort((candidates, lengths, -similarity, tier))[:top_n]
+        return [self.keys[i] for i in candidates[order]]
+
+
+def _text(df: pd.DataFrame, col: str) -> pd.Series:
+    return df[col].astype(object).where(df[col].notna(), "").astype(str).str.strip()
+
+
+def build_search_index(df: pd.DataFrame, name_col: str, key_candidates=(), detail_col: str | None = None,
+                       extra_cols=()) -> SearchIndex:
+    """
+    Indeks nazw ramki; etykieta na liście = nazwa (+ np. miasto, żeby odróżnić projekty o tej samej nazwie).
+    `extra_cols` – kolumny przeszukiwane razem z nazwą (np. miasto, adres, numer certyfikatu).
+    """
+    names = df[name_col] if name_col in df.columns else pd.Series([""] * len(df), index=df.index)
+    labels = names.astype(object).where(names.notna(), "(brak nazwy)").astype(str)
+    if detail_col and detail_col in df.columns:
+        detail = _text(df, detail_col)
+        labels = labels.where(detail.isin(["", "nan"]), labels + " · " + detail)
+    extra = None
+    cols = [c for c in extra_cols if c in df.columns]
+    if cols:
+        extra = _text(df, cols[0])
+        for c in cols[1:]:
+            extra = extra + " " + _text(df, c)
+        extra = extra.tolist()
+    return SearchIndex(row_keys(df, key_candidates), names.tolist(), labels.tolist(), extra=extra)
+
+
+def request_goto(page: str, picker_key: str, row_key: str, **state) -> None:
+    """
+    Otwiera rekord na innej stronie: project_picker z kluczem `picker_key` wybierze `row_key`
+    (także gdy filtry strony go wykluczają). `state` – dodatkowe wpisy session_state dla strony docelowej.
+    """
+    st.session_state[f"{picker_key}_goto"] = row_key
+    for k, v in state.items():
+        st.session_state[k] = v
+    st.switch_page(page)
+
+
+def project_picker(index: SearchIndex, key: str, within: np.ndarray | None = None,
+                   top_n: int = SEARCH_TOP_N) -> int | None:
+    """Pole wyszukiwania + lista top-N trafień; zwraca pozycję wybranego wiersza w ramce bazowej (None = brak trafień)."""
+    goto = st.session_state.pop(f"{key}_goto", None)
+    if goto is not None:
+        if index.position(goto) is None:
+            st.info("Rekordu wybranego w wyszukiwarce nie ma w danych tej strony.")
+        else:
+            # rekord z wyszukiwarki na stronie głównej: przypięty na liście do zmiany zapytania
+            st.session_state[f"{key}_q"] = ""
+            st.session_state[f"{key}_last_q"] = ""
+            st.session_state[f"{key}_pin"] = goto
+            st.session_state[key] = goto
+
+    query = st.text_input(
+        "Szukaj projektu", key=f"{key}_q", placeholder="fragment nazwy – wielkość liter i polskie znaki bez znaczenia",
+    )
+    changed = st.session_state.get(f"{key}_last_q") != query
+    if changed:
+        st.session_state.pop(f"{key}_pin", None)
+    keys = index.search(query, top_n=top_n, within=within)
+    pin = st.session_state.get(f"{key}_pin")
+    if pin is not None and index.position(pin) is not None:
+        keys = [pin] + [k for k in keys if k != pin]
+    if not keys:
+        st.info("Brak projektów pasujących do wyszukiwania.")
+        return None
+    # nowe zapytanie (albo wybór spoza listy, np. po zmianie filtrów) -> najlepsze trafienie
+    if changed or st.session_state.get(key) not in keys:
+        st.session_state[key] = keys[0]
+    st.session_state[f"{key}_last_q"] = query
+    sel = st.selectbox("Wybierz projekt", keys, key=key, format_func=index.label)
+    return index.position(sel)
@@ -0,0 +1,227 @@
+# utils/shared_cache.py
+# Wymienny backend cache wspólny dla procesów/replik (domyślnie SQLite na wspólnym dysku).
+# Zapis w jednej transakcji (atomowy), wpisy z terminem ważności, przeterminowane są usuwane przy zapisie.
+import functools
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.singleflight import get_single_flight
+
+# "sqlite" (wspólny dla procesów) albo "memory" (tylko bieżący proces)
+SHARED_CACHE_BACKEND = os.getenv("SHARED_CACHE_BACKEND", "sqlite")
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", os.path.join(".cache", "shared.sqlite"))
+# część każdego klucza – podbić przy zmianie, której nie widać w kodzie (np. format zapisanych wartości)
+CACHE_VERSION = 1
+
+
+class MemoryBackend:
+    def __init__(self):
+        self._data: dict[str, tuple[object, float, float | None]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """(wartość, stored_at) albo None, gdy brak/przeterminowane."""
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, stored_at, expires_at = item
+        if expires_at is not None and expires_at <= time.time():
+            return None
+        return value, stored_at
+
+    def set(self, key: str, value, ttl: float | None = None) -> None:
+        now = time.time()
+        with self._lock:
+            self._data[key] = (value, now, now + ttl if ttl else None)
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        for k in [k for k, (_, _, exp) in self._data.items() if exp is not None and exp <= now]:
+            del self._data[k]
+
+    def delete(self, prefix: str = "") -> None:
+        with self._lock:
+            for k in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[k]
+
+
+class SQLiteBackend:
+    """Wartości jako pickle; każde wywołanie otwiera własne połączenie (WAL – odczyty nie czekają na zapis)."""
+
+    def __init__(self, path: str = SHARED_CACHE_PATH):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with self._connect() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache (
+                    key        TEXT PRIMARY KEY,
+                    value      BLOB NOT NULL,
+                    stored_at  REAL NOT NULL,
+                    expires_at REAL
+                )
+                """
+            )
+            con.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires_at)")
+
+    @contextmanager
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=30)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def get(self, key: str):
+        with self._connect() as con:
+            row = con.execute(
+                "SELECT value, stored_at FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return pickle.loads(row[0]), row[1]
+        except Exception:
+            # wpis z innej wersji kodu – traktujemy jak brak
+            return None
+
+    def set(self, key: str, value, ttl: float | None = None) -> None:
+        now = time.time()
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._connect() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO cache (key, value, stored_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, blob, now, now + ttl if ttl else None),
+            )
+            con.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+
+    def delete(self, prefix: str = "") -> None:
+        with self._connect() as con:
+            con.execute("DELETE FROM cache WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+
+
+def _code_parts(code):
+    yield code.co_code
+    for c in code.co_consts:
+        if hasattr(c, "co_code"):
+            # zagnieżdżone funkcje/lambdy – ich repr zawiera adres w pamięci, więc rekurencyjnie
+            yield from _code_parts(c)
+        elif isinstance(c, frozenset):
+            # kolejność elementów zależy od losowego seeda hashowania – sortujemy
+            yield repr(sorted(map(repr, c))).encode("utf-8")
+        else:
+            yield repr(c).encode("utf-8")
+
+
+def _code_names(code):
+    yield from code.co_names
+    for c in code.co_consts:
+        if hasattr(c, "co_code"):
+            yield from _code_names(c)
+
+
+@functools.lru_cache(maxsize=None)
+def _module_source_hash(module_name: str) -> str:
+    path = getattr(sys.modules.get(module_name), "__file__", None)
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except (OSError, TypeError):
+        return ""
+
+
+def _helper_modules(fn) -> set[str]:
+    """
+    Moduły utils.* z funkcjami, których używa fn (np. read_excel_cached, compact_frame, rename_columns),
+    także pośrednio – przez funkcje pomocnicze wołane z tych funkcji.
+    """
+    modules: set[str] = set()
+    seen: set[int] = set()
+    stack = [fn]
+    while stack:
+        f = stack.pop()
+        code = getattr(f, "__code__", None)
+        if code is None or id(code) in seen:
+            continue
+        seen.add(id(code))
+        scope = getattr(f, "__globals__", {})
+        for name in _code_names(code):
+            obj = scope.get(name)
+            if obj is None:
+                continue
+            module = obj.__name__ if isinstance(obj, type(sys)) else getattr(obj, "__module__", None)
+            if not isinstance(module, str) or not module.startswith("utils."):
+                continue
+            modules.add(module)
+            if callable(obj):
+                stack.append(getattr(obj, "__wrapped__", obj))
+    return modules
+
+
+def code_fingerprint(fn) -> str:
+    """
+    Skrót kodu funkcji (stały między procesami) – wpisy zbudowane starszą wersją kodu nie są używane.
+    Obejmuje też CACHE_VERSION i źródła modułów utils.* z funkcjami pomocniczymi, których fn używa.
+    """
+    code = getattr(fn, "__code__", None)
+    if code is None:
+        return ""
+    parts = [str(CACHE_VERSION).encode("utf-8"), *_code_parts(code)]
+    parts += [f"{m}:{_module_source_hash(m)}".encode("utf-8") for m in sorted(_helper_modules(fn))]
+    return hashlib.sha1(b"\0".join(parts)).hexdigest()[:8]
+
+
+_backend_lock = threading.Lock()
+_backend = None
+
+
+def get_cache_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = MemoryBackend() if SHARED_CACHE_BACKEND == "memory" else SQLiteBackend()
+        return _backend
+
+
+def shared_cache(ttl: float | None, name: str | None = None):
+    """
+    Dekorator w stylu st.cache_data, ale z backendem wspólnym dla procesów.
+    Klucz: nazwa + argumenty (JSON); równoległe chybienia w procesie liczą wartość raz.
+    """
+    def deco(fn):
+        prefix = f"fn:{name or fn.__qualname__}:{code_fingerprint(fn)}:"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = prefix + json.dumps([args, kwargs], sort_keys=True, default=str)
+            backend = get_cache_backend()
+            hit = backend.get(key)
+            if hit is not None:
+                return hit[0]
+
+            def compute():
+                again = backend.get(key)
+                if again is not None:
+                    return again[0]
+                value = fn(*args, **kwargs)
+                backend.set(key, value, ttl)
+                return value
+
+            value, _ = get_single_flight().do(key, compute)
+            return value
+
+        wrapper.clear = lambda: get_cache_backend().delete(f"fn:{name or fn.__qualname__}:")
+        return wrapper
+    return deco
@@ -0,0 +1,58 @@
+# utils/singleflight.py
+# Łączenie równoległych, identycznych zapytań: pierwszy wywołujący wykonuje pracę,
+# pozostali z tym samym kluczem czekają na jego wynik (albo wyjątek) zamiast pytać API ponownie.
+import threading
+from typing import Any, Callable
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: dict[Any, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn: Callable[[], Any]) -> tuple[Any, bool]:
+        """Zwraca (wynik, shared) – shared=True, gdy wynik pochodzi z cudzego zapytania w locie."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # klucz zwalniany przed sygnałem – kolejne wywołania po zakończeniu idą już do API
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.value, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+_group = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """Wspólna grupa dla procesu (wszystkie sesje Streamlit)."""
+    return _group
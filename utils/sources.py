@@ -0,0 +1,53 @@
+# utils/sources.py
+# Kolumny plików Excel -> nazwy wspólne. Jedna mapa na źródło, używana przez strony
+# i przez wspólną wyszukiwarkę (utils.unified_search), żeby obie czytały dane tak samo.
+
+BREEAM_EXCEL_RENAME = {
+    "Nazwa budynku": "asset_name",
+    "Rodzaj budynku": "projectType",
+    "System": "system",
+    "Standard": "standard",
+    "Scheme": "scheme",
+    "Rating": "rating",
+    "Status/Data ważności": "stage",
+    "Województwo": "region",
+    "Miasto": "city",
+    "Adres": "regAddresLine1",
+    "Audytor/Assesor": "assessor",
+    "Assessor/Auditor": "assessor",
+    "Assessor": "assessor",
+    "Kraj": "country",
+    "Country": "country",
+    # czasem:
+    "Kod pocztowy": "postcode",
+    "Postcode": "postcode",
+    "Zipcode": "postcode",
+}
+
+LEED_RENAME = {
+    "Project Name": "asset_name",
+    "ProjectName": "asset_name",
+    "Name": "asset_name",
+    "Country": "country",
+    "City": "city",
+    "State/Province": "region",
+    "State": "region",
+    "LEEDSystemVersion": "LEEDSystemVersion",
+    "LEED System Version": "LEEDSystemVersion",
+    "LEED Rating System": "rating_system",
+    "Rating System": "rating_system",
+    "LEED Certification Level": "level",
+    "Certification Level": "level",
+    "Project ID": "project_id",
+    "ID": "project_id",
+    "URL": "publicUrl",
+    "Certification Date": "certification_date",
+    "CertDate": "certification_date",
+    "Award Date": "certification_date",
+    "Street": "Street",
+    "Zipcode": "Zipcode",
+}
+# kolumny LEED potrzebne stronie (normalizacja, adres do geokodowania, szczegóły) – pozostałe tylko na życzenie
+LEED_CORE_COLUMNS = list(dict.fromkeys(
+    list(LEED_RENAME) + ["Address", "Address1", "Street Address", "ZIP", "PostalCode", "Postal Code", "CertLevel"]
+))
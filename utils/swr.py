@@ -0,0 +1,157 @@
+# utils/swr.py
+# Cache "stale-while-revalidate": po upływie TTL od razu oddaje ostatnią dobrą odpowiedź,
+# a świeżą pobiera w tle i podmienia po nadejściu. Nieudane odświeżenie zostawia starą wartość.
+# Wpisy trzymane są we wspólnym backendzie (utils.shared_cache), więc repliki widzą tę samą świeżość.
+import functools
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from utils import telemetry
+from utils.shared_cache import get_cache_backend
+from utils.singleflight import SingleFlight
+
+# jak długo trzymać ostatnią dobrą odpowiedź (do serwowania jako "stale")
+SWR_RETENTION_SECONDS = 60 * 60 * 24 * 7
+# po nieudanym odświeżeniu kolejne nie wcześniej niż po 1 min, potem 2, 4… (najwyżej TTL)
+SWR_FAILURE_BACKOFF_SECONDS = 60
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class _Entry:
+    value: Any
+    fetched_at: float
+    error: str | None = None
+    # nieudane odświeżenia od ostatniej dobrej odpowiedzi (backoff wspólny dla procesów, bo wpis jest w backendzie)
+    failed_at: float | None = None
+    failures: int = 0
+
+
+class SWRCache:
+    """Cache wspólny dla sesji i procesów, świeżość śledzona osobno dla każdego zestawu argumentów."""
+
+    def __init__(self, fetch: Callable, ttl: float, name: str = ""):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.prefix = f"swr:{name or fetch.__qualname__}:"
+        self._refreshing: set[str] = set()
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+
+    def _key(self, args, kwargs) -> str:
+        return self.prefix + json.dumps([args, kwargs], sort_keys=True, default=str)
+
+    def _get(self, key: str) -> _Entry | None:
+        hit = get_cache_backend().get(key)
+        return hit[0] if hit is not None else None
+
+    def _set(self, key: str, entry: _Entry) -> None:
+        get_cache_backend().set(key, entry, SWR_RETENTION_SECONDS)
+
+    def get(self, *args, **kwargs):
+        key = self._key(args, kwargs)
+        entry = self._get(key)
+        if entry is None:
+            # pierwsze wywołanie nie ma czego oddać – czeka; równoległe chybienia dostają wynik
+            # (albo wyjątek) jednego pobrania, zamiast ponawiać je po kolei
+            def load():
+                found = self._get(key)
+                if found is None:
+                    found = _Entry(self.fetch(*args, **kwargs), time.time())
+                    self._set(key, found)
+                return found
+
+            entry, _ = self._flight.do(key, load)
+            return entry.value
+        stale = time.time() - entry.fetched_at > self.ttl
+        if stale and not self._backing_off(entry):
+            self._refresh_in_background(key, args, kwargs, entry.fetched_at)
+        telemetry.record(self._label(args), "stale" if stale else "hit")
+        return entry.value
+
+    def _label(self, args) -> str:
+        # dla funkcji w stylu breeam_get(path, ...) – endpoint, inaczej nazwa cache
+        if args and isinstance(args[0], str):
+            return "/" + args[0].lstrip("/")
+        return self.prefix.rstrip(":")
+
+    def _backing_off(self, entry: _Entry) -> bool:
+        """Czy po ostatnim nieudanym odświeżeniu trwa jeszcze przerwa (API nie jest odpytywane przy każdym rerunie)."""
+        if not entry.failures or entry.failed_at is None:
+            return False
+        delay = min(SWR_FAILURE_BACKOFF_SECONDS * 2 ** (entry.failures - 1), max(self.ttl, SWR_FAILURE_BACKOFF_SECONDS))
+        return time.time() - entry.failed_at < delay
+
+    def _refresh_in_background(self, key: str, args, kwargs, started_from: float) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self._set(key, _Entry(self.fetch(*args, **kwargs), time.time()))
+            except Exception as e:
+                old = self._get(key)
+                if old is not None and old.fetched_at != started_from:
+                    # inny proces zapisał w międzyczasie świeższą wartość – błąd tego odświeżenia jej nie nadpisuje
+                    log.info("Odświeżenie %s nie powiodło się, ale wpis jest już nowszy: %s", self._label(args), e)
+                    return
+                if old is not None:
+                    old.error = str(e)
+                    old.failed_at = time.time()
+                    old.failures += 1
+                    self._set(key, old)
+                log.warning("Odświeżenie %s nie powiodło się (%s. raz z rzędu): %s",
+                            self._label(args), old.failures if old is not None else 1, e)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, name="swr-refresh", daemon=True).start()
+
+    def fetched_at(self, *args, **kwargs) -> float | None:
+        entry = self._get(self._key(args, kwargs))
+        return entry.fetched_at if entry else None
+
+    def last_error(self, *args, **kwargs) -> str | None:
+        entry = self._get(self._key(args, kwargs))
+        return entry.error if entry else None
+
+    def is_refreshing(self, *args, **kwargs) -> bool:
+        return self._key(args, kwargs) in self._refreshing
+
+    def clear(self) -> None:
+        get_cache_backend().delete(self.prefix)
+
+
+_registry: dict[str, SWRCache] = {}
+_registry_lock = threading.Lock()
+
+
+def swr_cache(ttl: float):
+    """
+    Dekorator: funkcja zwraca dane z SWRCache; cache dostępny jako atrybut `.swr`.
+    Strony Streamlit wykonują się od nowa przy każdym rerunie, więc cache jest rejestrowany
+    po nazwie funkcji – kolejne definicje podmieniają tylko `fetch`, dane zostają.
+    """
+    def deco(fn):
+        name = f"{fn.__module__}.{fn.__qualname__}"
+        with _registry_lock:
+            cache = _registry.get(name)
+            if cache is None:
+                cache = _registry[name] = SWRCache(fn, ttl, name=fn.__qualname__)
+            cache.fetch, cache.ttl = fn, ttl
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return cache.get(*args, **kwargs)
+
+        wrapper.swr = cache
+        return wrapper
+    return deco
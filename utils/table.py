@@ -0,0 +1,84 @@
+# utils/table.py
+# Tabele z kolorem wiersza wg months_to_expiry: style liczone jednym przebiegiem dla całej ramki
+# (zamiast Styler.apply(axis=1) – wywołania Pythona na każdy wiersz), a duże ramki stronicowane.
+import os
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.expiry import EXPIRY_BINS, EXPIRY_COLORS
+
+# powyżej tylu wierszy tabela jest dzielona na strony (kolorowana jest tylko bieżąca strona)
+TABLE_PAGINATE_ROWS = int(os.getenv("TABLE_PAGINATE_ROWS", "1000"))
+TABLE_PAGE_SIZE = int(os.getenv("TABLE_PAGE_SIZE", "500"))
+
+
+def expiry_row_colors(months) -> np.ndarray:
+    """Kolor tła dla każdego wiersza ("" dla braku daty) – binning jak expiry_status."""
+    m = pd.to_numeric(pd.Series(months), errors="coerce").astype("float64")
+    codes = pd.cut(m, bins=EXPIRY_BINS, labels=False, right=True).to_numpy()
+    palette = np.array(EXPIRY_COLORS + [""], dtype=object)
+    return palette[np.where(np.isnan(codes), len(EXPIRY_COLORS), codes).astype(int)]
+
+
+def _row_css(df: pd.DataFrame) -> pd.DataFrame:
+    colors = expiry_row_colors(df["months_to_expiry"])
+    css = np.where(colors == "", "", "background-color: " + colors.astype(str))
+    return pd.DataFrame(np.repeat(css[:, None], df.shape[1], axis=1), index=df.index, columns=df.columns)
+
+
+def style_by_expiry(df: pd.DataFrame):
+    """Styler z kolorami wierszy – jedno wywołanie funkcji na całą ramkę (axis=None)."""
+    if "months_to_expiry" not in df.columns:
+        return df
+    return df.style.apply(_row_css, axis=None)
+
+
+def render_expiry_table(df: pd.DataFrame, key: str, paginate_rows: int = TABLE_PAGINATE_ROWS,
+                        page_size: int = TABLE_PAGE_SIZE) -> None:
+    """st.dataframe z kolorami; od `paginate_rows` wierszy – strony po `page_size`."""
+    if len(df) <= paginate_rows:
+        st.dataframe(style_by_expiry(df), use_container_width=True)
+        return
+
+    pages = (len(df) + page_size - 1) // page_size
+    c1, c2 = st.columns([1, 4])
+    page = c1.number_input("Strona", min_value=1, max_value=pages, value=1, step=1, key=f"{key}_page")
+    start = (int(page) - 1) * page_size
+    part = df.iloc[start:start + page_size]
+    c2.caption(f"Wiersze {start + 1:,}–{start + len(part):,} z {len(df):,} (strona {int(page)}/{pages})")
+    st.dataframe(style_by_expiry(part), use_container_width=True)
+
+
+def page_slice(df: pd.DataFrame, page: int, page_size: int, sort_by: str | None = None,
+               ascending: bool = True) -> pd.DataFrame:
+    """Sortowanie i wycinek strony po stronie serwera – do przeglądarki trafia tylko ten wycinek."""
+    start = (page - 1) * page_size
+    if sort_by and sort_by in df.columns:
+        # sortowana jest tylko kolumna klucza (pozycje wierszy), kopiowany tylko wycinek strony
+        order = df[sort_by].reset_index(drop=True).sort_values(ascending=ascending, kind="stable", na_position="last").index
+        return df.iloc[order[start:start + page_size]]
+    return df.iloc[start:start + page_size]
+
+
+def render_paged_table(df: pd.DataFrame, key: str, sort_options: list[str] | None = None,
+                       page_sizes=(50, 100, 250, 500)) -> None:
+    """Tabela stronicowana po stronie serwera: rozmiar strony, numer strony i sortowanie w pandas."""
+    if df.empty:
+        st.info("Brak wierszy do wyświetlenia.")
+        return
+    sort_options = [c for c in (sort_options or list(df.columns)) if c in df.columns]
+    c1, c2, c3, c4 = st.columns([2, 1, 1, 1])
+    sort_by = c1.selectbox("Sortuj wg", ["(bez sortowania)"] + sort_options, key=f"{key}_sort")
+    ascending = c2.radio("Kierunek", ["rosnąco", "malejąco"], horizontal=True, key=f"{key}_dir") == "rosnąco"
+    page_size = int(c3.selectbox("Wierszy na stronę", list(page_sizes), index=1, key=f"{key}_size"))
+    pages = max(1, (len(df) + page_size - 1) // page_size)
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    page = int(c4.number_input("Strona", min_value=1, max_value=pages, value=1, step=1, key=f"{key}_page"))
+
+    part = page_slice(df, page, page_size, None if sort_by == "(bez sortowania)" else sort_by, ascending)
+    start = (page - 1) * page_size
+    st.caption(f"Wiersze {min(start + 1, len(df)):,}–{start + len(part):,} z {len(df):,} (strona {page}/{pages})")
+    st.dataframe(style_by_expiry(part), use_container_width=True)
@@ -0,0 +1,61 @@
+# utils/telemetry.py
+# Telemetria zapytań do API w pamięci procesu: czas, rozmiar odpowiedzi, trafienia cache, ponowienia.
+# Ostatnie TELEMETRY_MAX_EVENTS zdarzeń – wystarczy do panelu diagnostyki, bez zewnętrznych narzędzi.
+import threading
+import time
+from collections import deque
+
+import pandas as pd
+
+TELEMETRY_MAX_EVENTS = 2000
+
+# wynik odczytu: "miss" (pobrane z API), "revalidated" (304), "fresh"/"hit" (bez zapytania),
+# "stale" (stara wartość, odświeżanie w tle), "shared" (wynik cudzego zapytania w locie)
+CACHE_HITS = ("hit", "fresh", "revalidated", "stale", "shared")
+
+_events: deque = deque(maxlen=TELEMETRY_MAX_EVENTS)
+_lock = threading.Lock()
+
+
+def record(endpoint: str, cache: str, seconds: float | None = None, size: int | None = None,
+           retries: int = 0, error: str = "") -> None:
+    with _lock:
+        _events.append({
+            "ts": time.time(), "endpoint": endpoint, "cache": cache, "seconds": seconds,
+            "size": size, "retries": retries, "error": error,
+        })
+
+
+def response_retries(response) -> int:
+    """Liczba ponowień urllib3 dla odpowiedzi requests (0, gdy brak historii)."""
+    retries = getattr(getattr(response, "raw", None), "retries", None)
+    return len(getattr(retries, "history", ()) or ())
+
+
+def events() -> pd.DataFrame:
+    with _lock:
+        return pd.DataFrame(list(_events))
+
+
+def summary() -> pd.DataFrame:
+    """Zestawienie per endpoint: liczba wywołań, trafienia/chybienia cache, czas (śr./p95), bajty, ponowienia, błędy."""
+    df = events()
+    if df.empty:
+        return df
+    df["hit"] = df["cache"].isin(CACHE_HITS)
+    out = df.groupby("endpoint").agg(
+        calls=("cache", "size"),
+        hits=("hit", "sum"),
+        misses=("hit", lambda s: int((~s).sum())),
+        avg_s=("seconds", "mean"),
+        p95_s=("seconds", lambda s: s.quantile(0.95)),
+        bytes=("size", "sum"),
+        retries=("retries", "sum"),
+        errors=("error", lambda s: int((s != "").sum())),
+    )
+    return out.round({"avg_s": 3, "p95_s": 3}).reset_index()
+
+
+def clear() -> None:
+    with _lock:
+        _events.clear()
@@ -0,0 +1,209 @@
+# utils/unified_search.py
+# Wspólna wyszukiwarka certyfikatów (strona główna) po BREEAM API (lokalna kopia), BREEAM Excel i LEED:
+# nazwa, miasto, adres, assessor i numer certyfikatu. Jeden indeks złożony z segmentów – po jednym
+# na źródło. Przed zapytaniem sprawdzane są tanie wersje źródeł (mtime pliku / stan lokalnej kopii API)
+# i przebudowywany jest tylko segment źródła, które się zmieniło.
+import os
+import threading
+import time
+from datetime import date
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from utils.breeam_api import BREEAM_API_RENAME
+from utils.breeam_store import get_assessment_store
+from utils.dates import parse_dates
+from utils.excel_cache import read_excel_cached
+from utils.expiry import months_left_signed
+from utils.frames import rename_columns
+from utils.search import build_search_index, normalize_text, row_keys
+from utils.sources import BREEAM_EXCEL_RENAME, LEED_CORE_COLUMNS, LEED_RENAME
+
+UNIFIED_TOP_N = 20
+
+# pole dokumentu -> kolumny (po zmianie nazw), pierwsza istniejąca wygrywa
+FIELDS = {
+    "name": ("asset_name",),
+    "city": ("city",),
+    "address": ("regAddresLine1", "addressLine1", "Street", "Address", "Address1", "Street Address"),
+    "assessor": ("assessor",),
+    "certificate": ("certificate_number", "project_id"),
+}
+
+
+class Source:
+    """Źródło wyszukiwarki: `version()` – tani znacznik zmian, `load()` – dokumenty (key + FIELDS)."""
+
+    def __init__(self, name: str, label: str, page: str, picker_key: str,
+                 version: Callable[[], object], load: Callable[[], pd.DataFrame]):
+        self.name = name
+        self.label = label
+        self.page = page
+        # klucz project_picker na stronie docelowej (utils.search.request_goto)
+        self.picker_key = picker_key
+        self.version = version
+        self.load = load
+
+
+def _documents(df: pd.DataFrame, keys: list[str]) -> pd.DataFrame:
+    out = {"key": keys}
+    for field, cols in FIELDS.items():
+        col = next((c for c in cols if c in df.columns), None)
+        if col is None:
+            out[field] = [""] * len(df)
+        else:
+            s = df[col].astype(object).where(df[col].notna(), "").astype(str).str.strip()
+            out[field] = s.where(s.str.lower() != "nan", "").tolist()
+    return pd.DataFrame(out)
+
+
+def _file_version(path: str):
+    return os.stat(path).st_mtime_ns if os.path.exists(path) else None
+
+
+def _expired_version(path: str):
+    # wygasłe liczone na dziś – nowy dzień to nowa wersja segmentu
+    mtime = _file_version(path)
+    return None if mtime is None else (mtime, date.today())
+
+
+def _load_breeam_api() -> pd.DataFrame:
+    store = get_assessment_store()
+    df = store.load(store.scopes())
+    if df.empty:
+        return _documents(df, []).assign(scope=[])
+    parts = []
+    # "Otwórz" pokazuje na stronie BREEAM API jeden zakres – klucze liczone na ramce tego zakresu,
+    # tak jak ją buduje load_breeam_local (bez numeru certyfikatu klucz to pozycja w zakresie)
+    for scope, part in df.groupby("_scope", sort=False):
+        part = rename_columns(part.drop(columns="_scope"), BREEAM_API_RENAME)
+        if "certificate_number" in part.columns:
+            dup = part["certificate_number"].notna() & part.duplicated(subset="certificate_number")
+            part = part[~dup]
+        part = part.reset_index(drop=True)
+        parts.append(_documents(part, row_keys(part, ("certificate_number",))).assign(scope=scope))
+    docs = pd.concat(parts, ignore_index=True)
+    # ten sam certyfikat w kilku zakresach – jeden wynik (z pierwszego zakresu)
+    dup = (docs["certificate"] != "") & docs.duplicated(subset="certificate")
+    return docs[~dup].reset_index(drop=True)
+
+
+def _load_breeam_excel(path: str) -> pd.DataFrame:
+    # te same argumenty co na stronie -> ten sam plik Parquet; klucz = numer wiersza, jak na stronie
+    df = rename_columns(read_excel_cached(path, engine="openpyxl"), BREEAM_EXCEL_RENAME)
+    keys = row_keys(df)
+    # strona pokazuje tylko wygasłe na dziś (expiry z 'stage', months_to_expiry < 0) – reszty nie otworzy
+    if "stage" not in df.columns:
+        return _documents(df.iloc[:0], [])
+    months = months_left_signed(parse_dates(df["stage"], dayfirst=True))
+    expired = (months.notna() & (months < 0)).to_numpy()
+    return _documents(df[expired], [k for k, e in zip(keys, expired) if e])
+
+
+def _load_leed(path: str) -> pd.DataFrame:
+    df = rename_columns(read_excel_cached(path, columns=LEED_CORE_COLUMNS, engine="openpyxl"), LEED_RENAME)
+    return _documents(df, row_keys(df, ("project_id",)))
+
+
+def default_sources(breeam_excel_path: str, leed_path: str) -> list[Source]:
+    return [
+        Source("breeam_api", "BREEAM aktualne (API)", "pages/1_BREEAM_API_InUse.py", "b_proj_sel",
+               version=lambda: get_assessment_store().version(), load=_load_breeam_api),
+        Source("breeam_excel", "BREEAM wygasłe (Excel)", "pages/2_BREEAM_Wygasle_Excel.py", "exp_proj_sel",
+               version=lambda: _expired_version(breeam_excel_path),
+               load=lambda: _load_breeam_excel(breeam_excel_path)),
+        Source("leed", "LEED", "pages/3_LEED_Excel.py", "l_proj_sel",
+               version=lambda: _file_version(leed_path), load=lambda: _load_leed(leed_path)),
+    ]
+
+
+class UnifiedIndex:
+    """
+    Segmenty: źródło -> (wersja, SearchIndex, dokumenty). Zapytanie idzie do wszystkich segmentów,
+    wyniki są łączone wspólnym rankingiem SearchIndex.rank (poziom, podobieństwo, długość nazwy).
+    """
+
+    def __init__(self, sources: list[Source]):
+        self.sources = {s.name: s for s in sources}
+        self._segments: dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self.errors: dict[str, str] = {}
+        self.built: dict[str, dict] = {}
+
+    def refresh(self) -> list[str]:
+        """Przebudowuje segmenty źródeł o zmienionej wersji; zwraca ich nazwy (zwykle pusta lista)."""
+        rebuilt = []
+        with self._lock:
+            for name, src in self.sources.items():
+                try:
+                    version = src.version()
+                    seg = self._segments.get(name)
+                    if seg is not None and seg[0] == version:
+                        continue
+                    if version is None:
+                        # brak źródła (np. pliku) – segment znika
+                        self._segments = {k: v for k, v in self._segments.items() if k != name}
+                        continue
+                    t0 = time.perf_counter()
+                    docs = src.load()
+                    index = build_search_index(
+                        docs, "name", key_candidates=("key",), detail_col="city",
+                        extra_cols=("city", "address", "assessor", "certificate"),
+                    )
+                    # podmiana całego słownika – równoległe zapytania widzą starą albo nową wersję, nigdy połowę
+                    self._segments = {**self._segments, name: (version, index, docs)}
+                    self.built[name] = {"rows": len(docs), "seconds": round(time.perf_counter() - t0, 3),
+                                        "at": time.time()}
+                    self.errors.pop(name, None)
+                    rebuilt.append(name)
+                except Exception as e:
+                    # segment z poprzedniej wersji (jeśli był) zostaje
+                    self.errors[name] = str(e)
+        return rebuilt
+
+    def __len__(self) -> int:
+        return sum(seg[1].n for seg in self._segments.values())
+
+    def search(self, query: str, top_n: int = UNIFIED_TOP_N) -> pd.DataFrame:
+        """Najlepsze trafienia ze wszystkich źródeł: źródło, strona, klucz rekordu i pola dokumentu."""
+        q = normalize_text(query)
+        segments = self._segments
+        parts = []
+        if q:
+            for name, (_, index, _docs) in segments.items():
+                pos, tier, similarity, lengths = index.rank(q, np.ones(index.n, dtype=bool))
+                parts.append(pd.DataFrame({"source": name, "pos": pos, "tier": tier, "sim": similarity, "len": lengths}))
+        if not parts or not sum(len(p) for p in parts):
+            return pd.DataFrame(columns=["source", "source_label", "page", "picker_key", "label", "scope", *FIELDS, "key"])
+        hits = (
+            pd.concat(parts, ignore_index=True)
+            .sort_values(["tier", "sim", "len"], ascending=[True, False, True], kind="stable")
+            .head(top_n)
+        )
+        rows = []
+        for name, pos in zip(hits["source"], hits["pos"]):
+            _, index, docs = segments[name]
+            src = self.sources[name]
+            doc = docs.iloc[int(pos)]
+            rows.append({
+                "source": name, "source_label": src.label, "page": src.page, "picker_key": src.picker_key,
+                "label": index.labels[int(pos)], "scope": doc.get("scope"), **{f: doc[f] for f in FIELDS},
+                "key": doc["key"],
+            })
+        return pd.DataFrame(rows)
+
+
+_unified_lock = threading.Lock()
+_unified: UnifiedIndex | None = None
+
+
+def get_unified_index(breeam_excel_path: str = "BREEAM.xlsx",
+                      leed_path: str = "PublicLEEDProjectDirectory.xlsx") -> UnifiedIndex:
+    """Raz na proces (wspólny dla sesji); segmenty budowane przy pierwszym refresh()."""
+    global _unified
+    with _unified_lock:
+        if _unified is None:
+            _unified = UnifiedIndex(default_sources(breeam_excel_path, leed_path))
+        return _unified